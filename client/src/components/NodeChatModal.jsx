@@ -2,6 +2,7 @@ import { useState, useEffect, useRef } from 'react';
 import ReactMarkdown from 'react-markdown';
 import { FaRobot, FaPaperPlane, FaTimes, FaUser } from 'react-icons/fa';
 import useMobile from '../hooks/useMobile';
+import { useAuth } from '../context/AuthContext';
 
 function NodeChatModal({ mainTopic, subTopic, onClose }) {
   const [messages, setMessages] = useState([
@@ -11,6 +12,9 @@ function NodeChatModal({ mainTopic, subTopic, onClose }) {
   const [loading, setLoading] = useState(false);
   const bottomRef = useRef(null);
   const isMobile = useMobile();
+  const { user } = useAuth();
+  // One id per open chat: the server caches the rolling summary of older turns under it
+  const sessionIdRef = useRef(crypto.randomUUID());
 
   const scrollToBottom = () => bottomRef.current?.scrollIntoView({ behavior: "smooth" });
   useEffect(scrollToBottom, [messages]);
@@ -31,7 +35,9 @@ function NodeChatModal({ mainTopic, subTopic, onClose }) {
           topic: mainTopic,
           node_label: subTopic,
           message: userMsg.content,
-          history: messages 
+          history: messages,
+          session_id: sessionIdRef.current,
+          user_id: user?.id
         })
       });
       const data = await res.json();
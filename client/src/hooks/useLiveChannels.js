@@ -0,0 +1,39 @@
+import { useEffect, useRef } from 'react';
+
+// Subscribes to server-pushed rank updates (/api/stream) and keeps ranked lists in sync.
+// `subscriptions` maps channel -> setRows; all channels share ONE EventSource, since
+// every open stream holds a server thread.
+// The server sends a full snapshot first, then diffs: { upserts, removed, order, key }.
+const useLiveChannels = (subscriptions) => {
+  const settersRef = useRef(subscriptions);
+  settersRef.current = subscriptions;
+  const channels = Object.keys(subscriptions).sort().join(',');
+
+  useEffect(() => {
+    if (!channels) return;
+    const baseUrl = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:5000';
+    // If the server is at its stream cap it answers 503 and the page keeps its fetched data
+    const source = new EventSource(`${baseUrl}/api/stream?channels=${encodeURIComponent(channels)}`);
+
+    const listen = (channel) => (e) => {
+      const setRows = settersRef.current[channel];
+      if (!setRows) return;
+      const msg = JSON.parse(e.data);
+      if (msg.type === 'snapshot') {
+        setRows(msg.rows);
+        return;
+      }
+      setRows(prev => {
+        const byKey = {};
+        (prev || []).forEach(r => { byKey[r[msg.key]] = r; });
+        msg.upserts.forEach(r => { byKey[r[msg.key]] = r; });
+        return msg.order.map(k => byKey[k]).filter(Boolean);
+      });
+    };
+
+    channels.split(',').forEach(channel => source.addEventListener(channel, listen(channel)));
+    return () => source.close();
+  }, [channels]);
+};
+
+export default useLiveChannels;
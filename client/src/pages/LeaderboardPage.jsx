@@ -4,6 +4,7 @@ import { useNavigate } from 'react-router-dom';
 import Navbar from '../components/Navbar';
 import { FaTrophy, FaMedal, FaCrown, FaArrowLeft } from 'react-icons/fa'; 
 import useMobile from '../hooks/useMobile';
+import useLiveChannels from '../hooks/useLiveChannels';
 
 function LeaderboardPage() {
   const [leaders, setLeaders] = useState([]);
@@ -26,6 +27,9 @@ function LeaderboardPage() {
     fetchLeaders();
   }, []);
 
+  // Rank changes are pushed by the server instead of polling
+  useLiveChannels({ leaderboard: setLeaders });
+
   const getRankStyle = (index) => {
       if (index === 0) return { icon: <FaCrown size={24} color="#FFD700"/>, color: '#FFD700', bg: 'rgba(255, 215, 0, 0.1)' }; 
       if (index === 1) return { icon: <FaMedal size={24} color="#C0C0C0"/>, color: '#C0C0C0', bg: 'rgba(192, 192, 192, 0.1)' }; 
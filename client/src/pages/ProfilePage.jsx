@@ -64,7 +64,9 @@ function ProfilePage() {
     setLoading(true);
     try {
         const baseUrl = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:5000';
-        const roadmaps = await supabase.from('user_roadmaps').select('*').eq('user_id', user.id);
+        // graph_data lives in the deduplicated blob store now, so let the server hydrate it
+        const roadmapsRes = await axios.get(`${baseUrl}/api/user_roadmaps?user_id=${user.id}`);
+        const roadmaps = { data: roadmapsRes.data };
         const resources = await supabase.from('saved_resources').select('*').eq('user_id', user.id);
         const scores = await supabase.from('node_progress').select('*').eq('user_id', user.id).order('created_at', {ascending: false});
 
@@ -1,9 +1,10 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useState } from 'react';
 import axios from 'axios';
 import Navbar from '../components/Navbar';
 import { FaUsers, FaShieldAlt, FaPlus, FaSignInAlt, FaCrown, FaCopy, FaTrophy } from 'react-icons/fa';
 import { useAuth } from '../context/AuthContext';
 import useMobile from '../hooks/useMobile';
+import useLiveChannels from '../hooks/useLiveChannels';
 
 function SquadsPage() {
   const { user } = useAuth();
@@ -20,6 +21,16 @@ function SquadsPage() {
       if(user) fetchData();
   }, [user]);
 
+  // Live squad rankings + member scores pushed over SSE
+  const setMembers = useCallback((rows) => {
+      setMySquad(prev => prev ? { ...prev, members: typeof rows === 'function' ? rows(prev.members) : rows } : prev);
+  }, []);
+  const squadId = mySquad?.details?.id;
+  useLiveChannels({
+      squads: setSquadLeaderboard,
+      ...(squadId ? { [`squad:${squadId}`]: setMembers } : {})
+  });
+
   const fetchData = async () => {
       setLoading(true);
       try {
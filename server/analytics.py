@@ -0,0 +1,259 @@
+import os
+import time
+import threading
+import numpy as np
+
+# --- QUIZ / SATISFACTION ANALYTICS ---
+# node_progress is pulled in column batches into NumPy arrays (topics and nodes are
+# dictionary-encoded to int codes) and every rollup is a handful of bincounts, so it
+# stays fast at millions of rows. Refreshes are incremental: only rows at or after the
+# newest created_at already loaded are fetched.
+#
+# Quiz scores are out of 10; 5-question diagnostic attempts land in the same 0..10
+# histogram. A pass is quiz_score >= 6, the rule the profile and roadmap pages use.
+#
+# Deletes can't be seen incrementally. Deleting a user resets this worker's arrays
+# (see reset()); other workers pick the deletion up at their next full rebuild,
+# every ANALYTICS_REBUILD_SECONDS.
+
+PAGE_SIZE = 1000  # PostgREST's default max rows per request
+REFRESH_SECONDS = int(os.environ.get("ANALYTICS_REFRESH_SECONDS", 60))
+REBUILD_SECONDS = int(os.environ.get("ANALYTICS_REBUILD_SECONDS", 6 * 3600))
+PASS_SCORE = float(os.environ.get("ANALYTICS_PASS_SCORE", 6))
+SCORE_BINS = 11  # quiz scores 0..10
+WINDOWS = {'day': 86400, 'week': 7 * 86400, 'month': 30 * 86400}
+COLUMNS = 'id, topic, node_label, quiz_score, sentiment_score, created_at'
+
+
+class ProgressAnalytics:
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.topics, self.nodes = [], []          # code -> name
+        self._topic_codes, self._node_codes = {}, {}
+        self.topic = np.empty(0, np.int32)
+        self.node = np.empty(0, np.int32)         # code of (topic, node_label)
+        self.score = np.empty(0, np.float32)
+        self.sentiment = np.empty(0, np.float32)  # NaN when missing
+        self.created = np.empty(0, np.int64)
+        self.watermark = None                     # newest created_at string loaded
+        self._boundary_ids = set()                # ids already loaded at the watermark
+        self.refreshed_at = 0
+        self.built_at = time.time()
+        self._rollups = {}
+
+    # --- loading ---
+
+    def _code(self, mapping, names, key):
+        code = mapping.get(key)
+        if code is None:
+            code = mapping[key] = len(names)
+            names.append(key)
+        return code
+
+    def _fetch_new(self, watermark, skip_ids):
+        # watermark is fixed for the whole refresh; pages are keyed on id, not created_at
+        last_id = None
+        while True:
+            query = self.supabase.table('node_progress').select(COLUMNS)
+            if watermark:
+                query = query.gte('created_at', watermark)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            page = query.order('id').limit(PAGE_SIZE).execute().data
+            if not page:
+                return
+            yield [r for r in page if r['id'] not in skip_ids]
+            # Keep paging until an empty page: the server may cap pages below PAGE_SIZE
+            last_id = page[-1]['id']
+
+    def _encode(self, rows):
+        # Column-wise: one comprehension per field, then a single array conversion each
+        topics = [(r.get('topic') or '').strip().title() for r in rows]
+        topic = np.fromiter((self._code(self._topic_codes, self.topics, t) for t in topics),
+                            np.int32, len(rows))
+        node = np.fromiter((self._code(self._node_codes, self.nodes, (t, r.get('node_label') or ''))
+                            for t, r in zip(topics, rows)), np.int32, len(rows))
+        score = np.array([r.get('quiz_score') for r in rows], dtype=float).astype(np.float32)
+        sentiment = np.array([r.get('sentiment_score') for r in rows], dtype=float).astype(np.float32)
+        # Supabase returns ISO-8601 UTC strings; second precision is plenty
+        stamps = np.array([(r.get('created_at') or '')[:19] or 'NaT' for r in rows], 'datetime64[s]')
+        created = np.where(np.isnat(stamps), 0, stamps.astype(np.int64))
+        return topic, node, score, sentiment, created
+
+    def _advance_watermark(self, rows):
+        stamps = [r['created_at'] for r in rows if r.get('created_at')]
+        if not stamps:
+            return
+        newest = max(stamps)
+        if self.watermark is None or newest > self.watermark:
+            self.watermark = newest
+            self._boundary_ids = set()
+        if newest == self.watermark:
+            self._boundary_ids.update(
+                r['id'] for r in rows if r.get('created_at') == newest)
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and time.time() - self.refreshed_at < REFRESH_SECONDS:
+                return 0
+            if time.time() - self.built_at > REBUILD_SECONDS:
+                self._clear()
+            chunks = []
+            added = 0
+            for batch in self._fetch_new(self.watermark, set(self._boundary_ids)):
+                if batch:
+                    chunks.append(self._encode(batch))
+                    self._advance_watermark(batch)
+                    added += len(batch)
+            if chunks:
+                # One concatenate per refresh, not per page (cold builds stay linear)
+                current = (self.topic, self.node, self.score, self.sentiment, self.created)
+                (self.topic, self.node, self.score, self.sentiment, self.created) = [
+                    np.concatenate([column] + [c[i] for c in chunks])
+                    for i, column in enumerate(current)]
+            self.refreshed_at = time.time()
+            if added:
+                self._rollups = {}
+            return added
+
+    # --- rollups ---
+
+    def _group_stats(self, groups, n_groups, mask=None):
+        score, sentiment = self.score, self.sentiment
+        if mask is not None:
+            groups, score, sentiment = groups[mask], score[mask], sentiment[mask]
+
+        has_score = ~np.isnan(score)
+        s_groups, s_vals = groups[has_score], score[has_score]
+        count = np.bincount(s_groups, minlength=n_groups)
+        total = np.bincount(s_groups, weights=s_vals, minlength=n_groups)
+        total_sq = np.bincount(s_groups, weights=s_vals * s_vals, minlength=n_groups)
+        passed = np.bincount(s_groups, weights=(s_vals >= PASS_SCORE), minlength=n_groups)
+        bins = np.clip(np.rint(s_vals), 0, SCORE_BINS - 1).astype(np.int64)
+        hist = np.bincount(s_groups * SCORE_BINS + bins,
+                           minlength=n_groups * SCORE_BINS).reshape(n_groups, SCORE_BINS)
+
+        # Same rule as the satisfaction tile: zero / missing polarity is "no opinion"
+        has_sent = ~np.isnan(sentiment) & (sentiment != 0)
+        sent_count = np.bincount(groups[has_sent], minlength=n_groups)
+        sent_total = np.bincount(groups[has_sent], weights=sentiment[has_sent], minlength=n_groups)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            std = np.sqrt(np.maximum(total_sq / count - mean * mean, 0))
+            pass_rate = passed / count
+            sent_mean = sent_total / sent_count
+        return count, mean, std, pass_rate, hist, sent_count, sent_mean
+
+    def _rows(self, names, stats):
+        count, mean, std, pass_rate, hist, sent_count, sent_mean = stats
+        out = []
+        for i, name in enumerate(names):
+            if not count[i] and not sent_count[i]:
+                continue
+            out.append({
+                **name,
+                "attempts": int(count[i]),
+                "avg_score": _num(mean[i]),
+                "score_std": _num(std[i]),
+                "pass_rate": _num(pass_rate[i]),
+                "score_histogram": hist[i].tolist(),
+                "reviews": int(sent_count[i]),
+                "satisfaction": _num((sent_mean[i] + 1) / 2 * 100, 0)
+            })
+        out.sort(key=lambda r: r["attempts"], reverse=True)
+        return out
+
+    # Rollups are memoised until the next refresh that actually adds rows; the lock
+    # keeps them from reading the column arrays halfway through an append.
+
+    def topic_stats(self):
+        with self._lock:
+            return self._topic_stats()
+
+    def node_stats(self, topic=None):
+        with self._lock:
+            return self._node_stats(topic)
+
+    def sentiment_trend(self, window='day', topic=None):
+        with self._lock:
+            return self._sentiment_trend(window, topic)
+
+    def _topic_stats(self):
+        if 'topics' not in self._rollups:
+            stats = self._group_stats(self.topic, len(self.topics))
+            self._rollups['topics'] = self._rows(
+                [{"topic": t} for t in self.topics], stats)
+        return self._rollups['topics']
+
+    def _node_stats(self, topic=None):
+        cache_key = ('nodes', topic)
+        if cache_key not in self._rollups:
+            names = [{"topic": t, "node_label": n} for t, n in self.nodes]
+            mask = None
+            if topic:
+                code = self._topic_codes.get(topic.strip().title())
+                if code is None:
+                    return []
+                mask = self.topic == code
+            stats = self._group_stats(self.node, len(self.nodes), mask)
+            self._rollups[cache_key] = self._rows(names, stats)
+        return self._rollups[cache_key]
+
+    def _sentiment_trend(self, window, topic):
+        cache_key = ('trend', window, topic)
+        if cache_key in self._rollups:
+            return self._rollups[cache_key]
+
+        mask = ~np.isnan(self.sentiment) & (self.sentiment != 0) & (self.created > 0)
+        if topic:
+            code = self._topic_codes.get(topic.strip().title())
+            if code is None:
+                return []
+            mask &= self.topic == code
+        created, sentiment = self.created[mask], self.sentiment[mask]
+        if not created.size:
+            return []
+
+        size = WINDOWS[window]
+        bucket = created // size
+        first = bucket.min()
+        idx = bucket - first
+        count = np.bincount(idx)
+        total = np.bincount(idx, weights=sentiment)
+        trend = [{
+            "window_start": str(np.datetime64(int((first + i) * size), 's')),
+            "reviews": int(c),
+            "satisfaction": _num((total[i] / c + 1) / 2 * 100, 0)
+        } for i, c in enumerate(count) if c]
+        self._rollups[cache_key] = trend
+        return trend
+
+    def overall_satisfaction(self):
+        s = self.sentiment[~np.isnan(self.sentiment) & (self.sentiment != 0)]
+        return int(((s.mean() + 1) / 2) * 100) if s.size else 0
+
+    def summary(self):
+        return {
+            "rows": int(self.score.size),
+            "topics": len(self.topics),
+            "nodes": len(self.nodes),
+            "watermark": self.watermark,
+            "refreshed_at": self.refreshed_at,
+            "memory_kb": int(sum(a.nbytes for a in (
+                self.topic, self.node, self.score, self.sentiment, self.created)) / 1024)
+        }
+
+
+def _num(value, digits=2):
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), digits) if digits else int(round(float(value)))
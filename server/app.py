@@ -1,87 +1,304 @@
 import os
 import json
-import re
-import requests
+import time
+import threading
 import urllib.parse
 import random
 import string
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, has_request_context, jsonify, request, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from groq import Groq
-from googleapiclient.discovery import build
-from textblob import TextBlob
-from duckduckgo_search import DDGS
+from lazy import LazyClient
+import roadmap_store
+import llm_output
+import cache_store
+import rate_limit
+import resilience
+import outbox
+import token_budget
+import export
+import live_updates
+import tracing
+import llm_usage
+from prefetch import ResourcePrefetcher
 
 load_dotenv()
 app = Flask(__name__)
 CORS(app)
+# X-Forwarded-For is only trusted when we know how many proxies sit in front of us
+# (e.g. TRUSTED_PROXIES=1 on Render/Heroku); otherwise clients could forge their IP.
+if int(os.environ.get("TRUSTED_PROXIES", 0)):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ["TRUSTED_PROXIES"]))
 
 # --- CONFIGURATION ---
 GROQ_MODEL = "llama-3.3-70b-versatile"
+ROADMAP_CACHE_TTL = 7 * 24 * 3600
+QUIZ_CACHE_TTL = 3 * 24 * 3600
+RESOURCE_CACHE_TTL = 24 * 3600
+# Bundles built from fallbacks (provider down / breaker open) are retried soon
+DEGRADED_RESOURCE_TTL = 5 * 60
+SEARCH_TERM_CACHE_TTL = 30 * 24 * 3600
+QUIZ_POOL_SIZE = 15
+CHAT_SUMMARY_TTL = 24 * 3600
+HEDGE_SEARCH_TERM = os.environ.get("HEDGE_SEARCH_TERM", "1") == "1"
+
+# Heavy SDKs are imported on first use (see lazy.py) to keep worker boot fast.
+
 
 # 1. Supabase
-try:
-    supabase: Client = create_client(os.environ.get(
-        "SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
-except:
-    print("⚠️ Supabase Keys missing.")
+def create_supabase():
+    from supabase import create_client
+    try:
+        return create_client(os.environ.get(
+            "SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    except:
+        print("⚠️ Supabase Keys missing.")
+        return None
+
 
 # 2. Groq
-try:
-    groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-    print(f"✅ Groq Client Initialized (Model: {GROQ_MODEL})")
-except Exception as e:
-    print(f"⚠️ Groq Init Error: {e}")
+def create_groq():
+    from groq import Groq
+    try:
+        client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+        print(f"✅ Groq Client Initialized (Model: {GROQ_MODEL})")
+        return client
+    except Exception as e:
+        print(f"⚠️ Groq Init Error: {e}")
+        return None
+
 
 # 3. YouTube
-try:
-    youtube_client = build(
-        'youtube', 'v3', developerKey=os.environ.get("YOUTUBE_API_KEY"))
-except:
-    youtube_client = None
+def create_youtube():
+    from googleapiclient.discovery import build
+    try:
+        return build(
+            'youtube', 'v3', developerKey=os.environ.get("YOUTUBE_API_KEY"))
+    except:
+        return None
+
+
+supabase = LazyClient(create_supabase, 'Supabase')
+groq_client = LazyClient(create_groq, 'Groq')
+youtube_client = LazyClient(create_youtube, 'YouTube')
+
+# 4. Admission control for routes that fan out to paid / quota-limited APIs
+rate_limiter = rate_limit.create_limiter()
+
+# 5. Circuit breakers for external providers (timeouts adapt to observed latency)
+ddg_breaker = resilience.breaker('duckduckgo', min_timeout=1.5, max_timeout=5.0)
+youtube_breaker = resilience.breaker('youtube', min_timeout=1.5, max_timeout=6.0)
+search_term_breaker = resilience.breaker(
+    'groq_search_term', min_timeout=1.0, max_timeout=4.0)
+
+# 6. Durable write-behind queue for student writes. The drain thread starts on the
+# first request (or first enqueue), so importing app from scripts doesn't spawn it.
+
+
+@app.before_request
+def start_outbox_worker():
+    outbox.ensure_worker()
+
+
+# 7. Admin analytics (NumPy is only imported when an analytics route is first hit)
+def create_analytics():
+    try:
+        from analytics import ProgressAnalytics
+    except ImportError:
+        print("⚠️ numpy not installed, analytics disabled.")
+        return None
+    return ProgressAnalytics(supabase)
+
+
+progress_analytics = LazyClient(create_analytics, 'Analytics')
+
+# --- REQUEST PROFILING (opt-in via X-Profile header or admin sampling) ---
+
+
+@app.before_request
+def start_trace():
+    mode = tracing.requested_mode(request.headers.get('X-Profile'),
+                                  request.headers.get('X-Profile-Token'))
+    if mode:
+        g.trace = tracing.start(mode, f"{request.method} {request.path}")
+
+
+@app.after_request
+def finish_trace(response):
+    trace = g.pop('trace', None)
+    if trace:
+        tracing.finish(trace, response.status_code)
+        response.headers['X-Trace-Id'] = trace.id
+    return response
 
 # --- HELPER FUNCTIONS ---
 
 
+def client_ip():
+    # remote_addr already reflects X-Forwarded-For when ProxyFix is enabled
+    return f"ip:{request.remote_addr}"
+
+
+def client_identity():
+    user_id = request.args.get('user_id')
+    if not user_id and request.is_json:
+        user_id = (request.get_json(silent=True) or {}).get('user_id')
+    if user_id:
+        return f"user:{user_id}"
+    return client_ip()
+
+
+def rate_limited(route_class):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            ok, retry_after = rate_limiter.check(
+                route_class, client_identity(), client_ip())
+            if not ok:
+                response = jsonify(
+                    {"error": "Too many requests. Please slow down.", "retry_after": retry_after})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 def parse_json_safely(text, expected_type="dict"):
-    text = re.sub(r'```json\s*', '', text)
-    text = re.sub(r'```', '', text)
-    text = text.strip()
-    try:
-        if expected_type == "list":
-            start = text.find('[')
-            end = text.rfind(']') + 1
-            if start != -1 and end != -1:
-                text = text[start:end]
-        else:
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start != -1 and end != -1:
-                text = text[start:end]
-        return json.loads(text)
+    try:
+        return llm_output.loads_lenient(text, expected_type)
     except:
         return None
 
 
-def get_smart_search_term(long_text):
+def llm_caller():
+    # Prefetch / warm_cache threads run outside a request and are billed to 'system'
+    return client_identity() if has_request_context() else 'system'
+
+
+def groq_chat(route, estimated_prompt_tokens=None, caller=None, **kwargs):
+    """groq_client.chat.completions.create plus per-route / per-caller usage accounting."""
+    kwargs.setdefault('model', GROQ_MODEL)
+    caller = caller or llm_caller()
+    start = time.perf_counter()
+    try:
+        completion = groq_client.chat.completions.create(**kwargs)
+    except Exception:
+        llm_usage.record(route, caller, kwargs['model'],
+                         latency_ms=(time.perf_counter() - start) * 1000, error=True)
+        raise
+    usage = getattr(completion, 'usage', None)
+    llm_usage.record(route, caller, kwargs['model'], usage,
+                     (time.perf_counter() - start) * 1000)
+    token_budget.log_usage(route, completion, estimated_prompt_tokens)
+    return completion
+
+
+def llm_cache_hit(route):
+    llm_usage.record(route, llm_caller(), GROQ_MODEL, cached=True)
+
+
+def ask_groq_json(prompt, temperature):
+    completion = groq_chat(
+        'repair',
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        response_format={"type": "json_object"}
+    )
+    return parse_json_safely(completion.choices[0].message.content, "dict")
+
+
+def repair_roadmap(topic, mode, roadmap, missing):
+    # Ask only for the part that came back broken instead of regenerating the whole map
     try:
-        prompt = f"Extract the core technical topic from this text into a 3-5 word English search query. Return ONLY the raw string, no quotes: '{long_text}'"
-        completion = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
+        if 'nodes' in missing:
+            data = ask_groq_json(f"""
+            List the {4 if mode == 'panic' else 7} learning steps for '{topic}' ({mode} mode).
+            Return strict JSON: {{ "nodes": [{{ "id": "1", "label": "..." }}] }}
+            """, 0.1)
+            roadmap['nodes'] = llm_output.validate_nodes(data)
+        if 'flashcards' in missing:
+            have = len(roadmap['flashcards'])
+            data = ask_groq_json(f"""
+            Give {5 - have} key terms/definitions for '{topic}'.
+            Do not repeat: {', '.join(c['front'] for c in roadmap['flashcards']) or 'none'}.
+            Return strict JSON: {{ "flashcards": [{{ "front": "Term", "back": "Short Definition" }}] }}
+            """, 0.1)
+            roadmap['flashcards'] = (roadmap['flashcards'] +
+                                     llm_output.validate_flashcards(data))[:5]
+    except Exception as e:
+        print(f"Roadmap Repair Error: {e}")
+    return roadmap
+
+
+def repair_quiz(main, sub, items, missing):
+    try:
+        data = ask_groq_json(f"""
+        Write {missing} more multiple-choice questions on '{sub}' (Context: '{main}').
+        SCENARIO-BASED or CODE ANALYSIS, intermediate to advanced.
+        Do not repeat these questions: {json.dumps([q['question'] for q in items])}
+        Return strict JSON: {{ "questions": [{{ "question": "...", "options": ["A","B","C","D"], "correct_answer": 0 }}] }}
+        """, 0.2)
+        extra, _ = llm_output.validate_quiz(data, missing)
+        return items + extra
+    except Exception as e:
+        print(f"Quiz Repair Error: {e}")
+        return items
+
+
+def get_smart_search_term(long_text):
+    key = cache_store.make_key(long_text)
+    cached = cache_store.get('search_term', key)
+    if cached:
+        llm_cache_hit('search_term')
+        return cached
+    caller = llm_caller()  # hedged calls run on worker threads without the request
+    prompt = f"Extract the core technical topic from this text into a 3-5 word English search query. Return ONLY the raw string, no quotes: '{long_text}'"
+
+    def ask(timeout):
+        completion = groq_chat(
+            'search_term',
+            caller=caller,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1,
-            max_tokens=20
+            max_tokens=20,
+            timeout=timeout
         )
         return completion.choices[0].message.content.strip().replace('"', '')
+
+    def ask_hedged(timeout):
+        # Tiny prompt, so racing a second copy past the usual p90 is cheap insurance
+        hedge_after = min(timeout, max(0.5, search_term_breaker.percentile(90) or 1.0))
+        return resilience.hedged(lambda: ask(timeout), hedge_after, timeout)
+
+    try:
+        term = search_term_breaker.call(ask_hedged if HEDGE_SEARCH_TERM else ask)
+        cache_store.set('search_term', key, term, ttl=SEARCH_TERM_CACHE_TTL)
+        return term
     except:
         return " ".join(long_text.split()[:4])
 
 
-def get_youtube_videos(topic, mode='standard', max_results=5):
+def fetch_ddg_soup(url):
+    import requests
+    from bs4 import BeautifulSoup
+
+    def fetch(timeout):
+        response = requests.get(
+            url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=timeout)
+        # DuckDuckGo answers 202 with an empty page when it is throttling us
+        if response.status_code != 200:
+            raise requests.HTTPError(f"DuckDuckGo returned {response.status_code}")
+        return response.text
+    return BeautifulSoup(ddg_breaker.call(fetch), 'html.parser')
+
+
+def get_youtube_videos(topic, mode='standard', max_results=5, degraded=None):
     search_term = get_smart_search_term(topic)
 
     if mode == 'panic':
@@ -91,21 +308,25 @@ def get_youtube_videos(topic, mode='standard', max_results=5):
 
     if not youtube_client:
         return []
-    try:
-        search_request = youtube_client.search().list(
+
+    def fetch(timeout):
+        import httplib2
+        # googleapiclient has no default timeout, so bound each call explicitly
+        http = httplib2.Http(timeout=timeout)
+        search_response = youtube_client.search().list(
             q=query, part='snippet', type='video',
             maxResults=15, relevanceLanguage='en', videoCategoryId='27'
-        )
-        search_response = search_request.execute()
+        ).execute(http=http)
         video_ids = [item['id']['videoId']
                      for item in search_response.get('items', [])]
-
         if not video_ids:
-            return []
-
-        video_details = youtube_client.videos().list(
+            return {}
+        return youtube_client.videos().list(
             part='snippet,contentDetails', id=','.join(video_ids)
-        ).execute()
+        ).execute(http=http)
+
+    try:
+        video_details = youtube_breaker.call(fetch)
         videos = []
 
         for item in video_details.get('items', []):
@@ -126,30 +347,30 @@ def get_youtube_videos(topic, mode='standard', max_results=5):
                 })
         return videos
     except:
+        if degraded is not None:
+            degraded.add('videos')
         return []
 
 
-def scrape_articles(topic, mode='standard', max_results=4):
+def scrape_articles(topic, mode='standard', max_results=4, degraded=None):
     smart_topic = get_smart_search_term(topic)
     suffix = "cheat sheet summary" if mode == 'panic' else "tutorial geeksforgeeks w3schools"
     url = f"https://html.duckduckgo.com/html/?q={smart_topic} {suffix}&kl=us-en"
-    headers = {'User-Agent': 'Mozilla/5.0'}
     articles = []
 
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            for item in soup.find_all('div', class_='result', limit=max_results):
-                title = item.find('a', class_='result__a')
-                snippet = item.find('a', class_='result__snippet')
-                if title and snippet:
-                    articles.append({
-                        "title": title.text, "url": title['href'],
-                        "snippet": snippet.text, "type": "article"
-                    })
+        soup = fetch_ddg_soup(url)
+        for item in soup.find_all('div', class_='result', limit=max_results):
+            title = item.find('a', class_='result__a')
+            snippet = item.find('a', class_='result__snippet')
+            if title and snippet:
+                articles.append({
+                    "title": title.text, "url": title['href'],
+                    "snippet": snippet.text, "type": "article"
+                })
     except:
-        pass
+        if degraded is not None:
+            degraded.add('articles')
 
     if not articles:
         safe_topic = urllib.parse.quote(smart_topic)
@@ -174,10 +395,9 @@ def scrape_articles(topic, mode='standard', max_results=4):
     return articles
 
 
-def get_pdfs(topic, mode='standard', max_results=4):
+def get_pdfs(topic, mode='standard', max_results=4, degraded=None):
     smart_topic = get_smart_search_term(topic)
     pdfs = []
-    headers = {'User-Agent': 'Mozilla/5.0'}
     search_queries = [f"{smart_topic} cheat sheet filetype:pdf",
                       f"{smart_topic} lecture notes filetype:pdf"]
 
@@ -186,19 +406,22 @@ def get_pdfs(topic, mode='standard', max_results=4):
             break
         try:
             url = f"https://html.duckduckgo.com/html/?q={query}&kl=us-en"
-            response = requests.get(url, headers=headers, timeout=5)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                for item in soup.find_all('div', class_='result', limit=2):
-                    title_el = item.find('a', class_='result__a')
-                    if title_el:
-                        title_text = title_el.text
-                        if "PDF" not in title_text:
-                            title_text = f"[PDF] {title_text}"
-                        pdfs.append(
-                            {"title": title_text, "url": title_el['href'], "type": "PDF"})
+            soup = fetch_ddg_soup(url)
+            for item in soup.find_all('div', class_='result', limit=2):
+                title_el = item.find('a', class_='result__a')
+                if title_el:
+                    title_text = title_el.text
+                    if "PDF" not in title_text:
+                        title_text = f"[PDF] {title_text}"
+                    pdfs.append(
+                        {"title": title_text, "url": title_el['href'], "type": "PDF"})
+        except resilience.CircuitOpen:
+            if degraded is not None:
+                degraded.add('pdfs')
+            break
         except:
-            pass
+            if degraded is not None:
+                degraded.add('pdfs')
 
     safe_topic = urllib.parse.quote(smart_topic)
     if len(pdfs) < 4:
@@ -216,6 +439,37 @@ def get_pdfs(topic, mode='standard', max_results=4):
             pdfs.append(link)
     return pdfs
 
+
+def fetch_resource_bundle(search_query, mode='standard'):
+    key = cache_store.make_key(search_query, mode)
+    bundle = cache_store.get('resources', key)
+    if bundle is None:
+        degraded = set()
+        bundle = {
+            "videos": get_youtube_videos(search_query, mode, degraded=degraded),
+            "articles": scrape_articles(search_query, mode, degraded=degraded),
+            "pdfs": get_pdfs(search_query, mode, degraded=degraded),
+            "degraded": sorted(degraded)
+        }
+        # Don't let a short provider outage pin fallback links in the cache for a day
+        cache_store.set('resources', key, bundle,
+                        ttl=DEGRADED_RESOURCE_TTL if degraded else RESOURCE_CACHE_TTL)
+    return bundle
+
+
+# Bounded background pool that warms node resources as soon as a roadmap is shown
+resource_prefetcher = ResourcePrefetcher(
+    fetch_resource_bundle,
+    max_workers=int(os.environ.get("PREFETCH_WORKERS", 3)),
+    max_pending=int(os.environ.get("PREFETCH_MAX_PENDING", 50)),
+    is_cached=lambda q, mode: cache_store.get('resources', cache_store.make_key(q, mode)) is not None
+)
+
+
+def serve_roadmap(graph, topic, mode):
+    resource_prefetcher.enqueue_roadmap(topic, graph.get('nodes'), mode)
+    return jsonify(graph)
+
 # --- SQUAD ROUTES ---
 
 
@@ -242,6 +496,7 @@ def create_squad():
         supabase.table('leaderboard').update(
             {"squad_id": squad_id}).eq("user_id", user_id).execute()
 
+        live_updates.publish('squads', 'leaderboard', f"squad:{squad_id}")
         return jsonify({"success": True, "squad": new_squad.data[0]})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -266,6 +521,7 @@ def join_squad():
         supabase.table('leaderboard').update(
             {"squad_id": squad_id}).eq("user_id", user_id).execute()
 
+        live_updates.publish('squads', 'leaderboard', f"squad:{squad_id}")
         return jsonify({"success": True, "squad": squad.data[0]})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -313,7 +569,54 @@ def get_squad_leaderboard():
 # --- TUTOR CHAT ROUTE ---
 
 
+def summarize_chat(previous_summary, messages, caller=None):
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    completion = groq_chat(
+        'chat_summary',
+        caller=caller,
+        messages=[{"role": "user", "content": f"""
+        Update this running summary of a tutoring chat in at most 3 sentences.
+        Keep what the student already understands and what still confuses them.
+
+        CURRENT SUMMARY: {previous_summary or '(none)'}
+        NEW TURNS:
+        {transcript}
+        """}],
+        temperature=0.1,
+        max_tokens=150
+    )
+    return completion.choices[0].message.content.strip()
+
+
+chat_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-summary')
+chat_summaries_running = set()
+chat_summaries_lock = threading.Lock()
+
+
+def schedule_chat_summary(summary_key, due):
+    # Runs off the request path; the new summary is picked up on the student's next turn
+    with chat_summaries_lock:
+        if summary_key in chat_summaries_running:
+            return
+        chat_summaries_running.add(summary_key)
+    caller = llm_caller()
+
+    def run():
+        try:
+            summary = summarize_chat(due['summary'], due['messages'], caller)
+            cache_store.set('chat_summary', summary_key,
+                            {"summary": summary, "covered": due['covered']}, ttl=CHAT_SUMMARY_TTL)
+        except Exception as e:
+            print(f"⚠️ History Summary Error: {e}")
+        finally:
+            with chat_summaries_lock:
+                chat_summaries_running.discard(summary_key)
+
+    chat_summary_executor.submit(run)
+
+
 @app.route('/api/chat_node', methods=['POST'])
+@rate_limited('llm')
 def chat_node():
     data = request.json
     topic = data.get('topic')
@@ -333,14 +636,24 @@ def chat_node():
     4. Stay on topic. If they ask about something else, politely guide them back to '{node}'.
     """
 
+    # Recent turns verbatim within a token budget; older turns as a rolling summary cached
+    # per chat session (the client sends a random session_id; never keyed by IP)
+    session_id = data.get('session_id')
+    summary_key = cache_store.make_key(
+        data.get('user_id') or '', session_id, topic, node) if session_id else None
+    history_messages, due = token_budget.compact_history(
+        history, cache_store.get('chat_summary', summary_key) if summary_key else None)
+    if due and summary_key:
+        schedule_chat_summary(summary_key, due)
+
     messages = [{"role": "system", "content": system_prompt}]
-    # Append limited history (last 4 messages) to keep context but save tokens
-    messages.extend(history[-4:])
+    messages.extend(history_messages)
     messages.append({"role": "user", "content": message})
 
     try:
-        completion = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
+        completion = groq_chat(
+            'chat_node',
+            sum(token_budget.message_tokens(m) for m in messages),
             messages=messages,
             temperature=0.3,
             max_tokens=400
@@ -411,6 +724,10 @@ def admin_login():
         return jsonify({"success": False, "error": "Invalid credentials"}), 401
 
 
+def idempotency_key(data):
+    return request.headers.get('Idempotency-Key') or data.get('op_id')
+
+
 @app.route('/api/sync_guest_data', methods=['POST'])
 def sync_guest_data():
     data = request.json
@@ -422,45 +739,38 @@ def sync_guest_data():
         return jsonify({"error": "Missing user_id"}), 400
 
     try:
+        # Everything is queued locally in order and drained to Supabase in the background
         # 1. ALWAYS initialize user in leaderboard (with 0 points) if they are new
-        existing = supabase.table('leaderboard').select(
-            'user_id').eq('user_id', user_id).execute()
-        if not existing.data:
-            supabase.table('leaderboard').insert({
-                "user_id": user_id,
-                "full_name": full_name,
-                "score": 0,
-                "is_hidden": False
-            }).execute()
+        outbox.enqueue('init_user', {"user_id": user_id, "full_name": full_name})
 
         # 2. Sync Guest Data ONLY if it exists
         if guest_data:
             roadmap = guest_data.get('roadmap')
             if roadmap:
-                supabase.table('user_roadmaps').upsert({
+                outbox.enqueue('guest_roadmap', {
                     "user_id": user_id,
                     "topic": roadmap.get('topic', '').strip().title(),
                     "graph_data": roadmap.get('graph_data')
-                }).execute()
+                })
 
             progress_list = guest_data.get('progress', [])
             if progress_list:
                 for item in progress_list:
                     item['user_id'] = user_id
-                    supabase.table('node_progress').insert(item).execute()
+                    outbox.insert_row('node_progress', item)
 
-                    # Call internal submit logic to update leaderboard + squads
-                    submit_progress_internal(
-                        user_id,
-                        full_name,
-                        item.get('quiz_score', 0)
-                    )
+                    # Internal submit logic updates leaderboard + squads
+                    outbox.enqueue('progress', {
+                        "user_id": user_id,
+                        "username": full_name,
+                        "score": item.get('quiz_score', 0)
+                    })
 
             resources_list = guest_data.get('resources', [])
             if resources_list:
                 for res in resources_list:
                     res['user_id'] = user_id
-                    supabase.table('saved_resources').insert(res).execute()
+                    outbox.insert_row('saved_resources', res)
 
         return jsonify({"success": True, "message": "User initialized and synced successfully"})
 
@@ -522,27 +832,20 @@ def save_roadmap():
 
         if existing.data:
             return jsonify({"error": "duplicate", "message": f"You already have a {mode} roadmap for {topic} in your profile."}), 409
+    except Exception as e:
+        # Supabase unreachable: accept the save anyway, the outbox will retry it
+        print(f"Duplicate check skipped: {e}")
 
-        # 2. Save Roadmap
-        supabase.table('user_roadmaps').insert({
+    try:
+        # 2. Save Roadmap + Flashcards via the outbox
+        op_id = outbox.enqueue('save_roadmap', {
             "user_id": user_id,
             "topic": topic,
-            "mode": mode,  # Save the mode
-            "graph_data": data.get('graph_data')
-        }).execute()
-
-        # 3. Save Flashcards (if any)
-        if flashcards:
-            for card in flashcards:
-                supabase.table('user_flashcards').insert({
-                    "user_id": user_id,
-                    "topic": topic,
-                    "front": card['front'],
-                    "back": card['back'],
-                    "interval_days": 1
-                }).execute()
-
-        return jsonify({"message": "Saved"})
+            "mode": mode,
+            "graph_data": data.get('graph_data'),
+            "flashcards": flashcards
+        }, idempotency_key(data))
+        return jsonify({"message": "Saved", "op_id": op_id})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -551,7 +854,7 @@ def save_roadmap():
 def save_resource():
     data = request.json
     try:
-        supabase.table('saved_resources').insert({
+        op_id = outbox.insert_row('saved_resources', {
             "user_id": data.get('user_id'),
             "roadmap_topic": data.get('roadmap_topic').strip().title(),
             "node_label": data.get('node_label'),
@@ -559,69 +862,189 @@ def save_resource():
             "title": data.get('title'),
             "url": data.get('url'),
             "thumbnail": data.get('thumbnail', '')
-        }).execute()
-        return jsonify({"message": "Saved"})
+        }, idempotency_key(data))
+        return jsonify({"message": "Saved", "op_id": op_id})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-def submit_progress_internal(user_id, username, score, topic='', node_label='', feedback=''):
-    try:
-        # 1. Save Progress Log (if triggered by quiz)
-        if topic:
-            blob = TextBlob(feedback)
-            supabase.table('node_progress').insert({
-                "user_id": user_id,
-                "topic": topic.strip().title(),
-                "node_label": node_label,
-                "quiz_score": score,
-                "feedback_text": feedback,
-                "sentiment_score": blob.sentiment.polarity
-            }).execute()
+def submit_progress_internal(user_id, username, score, topic='', node_label='', feedback='', op=None):
+    # Runs from the outbox drain; raises so the op is retried. `op` checkpoints each
+    # Supabase write so a retry never re-adds points that already landed.
+    step = op.step if op else 0
+    advance = op.advance if op else (lambda s: None)
 
-        # 2. Update User & SQUAD Score
-        existing = supabase.table('leaderboard').select(
-            '*').eq('user_id', user_id).execute()
+    # 1. Save Progress Log (if triggered by quiz)
+    if topic and step < 1:
+        from textblob import TextBlob
+        blob = TextBlob(feedback)
+        supabase.table('node_progress').insert({
+            "user_id": user_id,
+            "topic": topic.strip().title(),
+            "node_label": node_label,
+            "quiz_score": score,
+            "feedback_text": feedback,
+            "sentiment_score": blob.sentiment.polarity
+        }).execute()
+        advance(1)
+
+    # 2. Update User & SQUAD Score
+    existing = supabase.table('leaderboard').select(
+        '*').eq('user_id', user_id).execute()
 
-        user_squad_id = None
+    user_squad_id = existing.data[0].get(
+        'squad_id') if existing.data else None  # Get their squad ID
 
+    if step < 2:
         if existing.data:
             new_score = existing.data[0]['score'] + score
-            user_squad_id = existing.data[0].get(
-                'squad_id')  # Get their squad ID
             supabase.table('leaderboard').update(
                 {"score": new_score, "full_name": username}).eq('user_id', user_id).execute()
         else:
             supabase.table('leaderboard').insert(
                 {"user_id": user_id, "full_name": username, "score": score}).execute()
+        advance(2)
+        live_updates.publish(
+            'leaderboard', f"squad:{user_squad_id}" if user_squad_id else None)
+
+    # 🔥 UPDATE SQUAD SCORE 🔥
+    if user_squad_id and step < 3:
+        squad_data = supabase.table('squads').select(
+            'total_score').eq('id', user_squad_id).execute()
+        if squad_data.data:
+            current_squad_score = squad_data.data[0]['total_score']
+            supabase.table('squads').update(
+                {"total_score": current_squad_score + score}).eq('id', user_squad_id).execute()
+        advance(3)
+        live_updates.publish('squads')
 
-        # 🔥 UPDATE SQUAD SCORE 🔥
-        if user_squad_id:
-            squad_data = supabase.table('squads').select(
-                'total_score').eq('id', user_squad_id).execute()
-            if squad_data.data:
-                current_squad_score = squad_data.data[0]['total_score']
-                supabase.table('squads').update(
-                    {"total_score": current_squad_score + score}).eq('id', user_squad_id).execute()
 
-        return jsonify({"message": "Saved"})
+@app.route('/api/submit_progress', methods=['POST'])
+def submit_progress():
+    data = request.json
+    try:
+        # Acknowledge once the result is durably queued; Supabase catches up in the background
+        op_id = outbox.enqueue('progress', {
+            "user_id": data.get('user_id'),
+            "username": data.get('username', 'Anonymous'),
+            "score": data.get('score', 0),
+            "topic": data.get('topic', ''),
+            "node_label": data.get('node_label', ''),
+            "feedback": data.get('feedback', '')
+        }, idempotency_key(data))
+        return jsonify({"message": "Saved", "op_id": op_id})
     except Exception as e:
-        print(f"Leaderboard/Squad Error: {e}")
+        print(f"Progress Queue Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+# --- OUTBOX HANDLERS ---
 
-@app.route('/api/submit_progress', methods=['POST'])
-def submit_progress():
-    data = request.json
-    return submit_progress_internal(
-        data.get('user_id'),
-        data.get('username', 'Anonymous'),
-        data.get('score', 0),
-        data.get('topic', ''),
-        data.get('node_label', ''),
-        data.get('feedback', '')
+
+@outbox.handler('insert')
+def outbox_insert(table, rows):
+    supabase.table(table).insert(rows).execute()
+
+
+@outbox.handler('progress')
+def outbox_progress(op):
+    p = op.payload
+    submit_progress_internal(p['user_id'], p['username'], p['score'], p.get('topic', ''),
+                             p.get('node_label', ''), p.get('feedback', ''), op=op)
+
+
+@outbox.handler('init_user')
+def outbox_init_user(op):
+    p = op.payload
+    existing = supabase.table('leaderboard').select(
+        'user_id').eq('user_id', p['user_id']).execute()
+    if not existing.data:
+        supabase.table('leaderboard').insert({
+            "user_id": p['user_id'],
+            "full_name": p['full_name'],
+            "score": 0,
+            "is_hidden": False
+        }).execute()
+
+
+@outbox.handler('guest_roadmap')
+def outbox_guest_roadmap(op):
+    p = op.payload
+    supabase.table('user_roadmaps').upsert({
+        "user_id": p['user_id'],
+        "topic": p['topic'],
+        "graph_hash": roadmap_store.put_graph(supabase, p['graph_data'])
+    }).execute()
+
+
+@outbox.handler('save_roadmap')
+def outbox_save_roadmap(op):
+    p = op.payload
+    if op.step < 1:
+        # Graph body goes to the deduplicated blob store
+        supabase.table('user_roadmaps').insert({
+            "user_id": p['user_id'],
+            "topic": p['topic'],
+            "mode": p['mode'],
+            "graph_hash": roadmap_store.put_graph(supabase, p['graph_data'])
+        }).execute()
+        op.advance(1)
+
+    if p['flashcards'] and op.step < 2:
+        supabase.table('user_flashcards').insert([{
+            "user_id": p['user_id'],
+            "topic": p['topic'],
+            "front": card['front'],
+            "back": card['back'],
+            "interval_days": 1
+        } for card in p['flashcards']]).execute()
+        op.advance(2)
+
+
+@app.route('/api/outbox/status', methods=['GET'])
+def get_outbox_status():
+    return jsonify(outbox.status())
+
+
+# --- LIVE RANK STREAM (SSE) ---
+
+
+@live_updates.register('leaderboard', 'user_id')
+def load_leaderboard():
+    return supabase.table('leaderboard').select(
+        '*').eq('is_hidden', False).order('score', desc=True).limit(10).execute().data
+
+
+@live_updates.register('squads', 'id')
+def load_squads():
+    return supabase.table('squads').select(
+        '*').order('total_score', desc=True).limit(10).execute().data
+
+
+@live_updates.register('squad', 'user_id', takes_id=True)
+def load_squad_members(squad_id):
+    return supabase.table('leaderboard').select(
+        '*').eq('squad_id', squad_id).order('score', desc=True).execute().data
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_updates():
+    # e.g. /api/stream?channels=leaderboard,squads,squad:42
+    channels = [c.strip() for c in request.args.get(
+        'channels', 'leaderboard').split(',') if c.strip()]
+    invalid = [c for c in channels if not live_updates.is_valid_channel(c)]
+    if invalid or not channels:
+        return jsonify({"error": f"Unknown channels: {', '.join(invalid)}"}), 400
+    # Soft cap: a stream holds a worker thread until the tab closes
+    if live_updates.at_capacity():
+        return jsonify({"error": "Live updates are busy, showing the last loaded data."}), 503
+
+    return Response(
+        stream_with_context(live_updates.subscribe(channels)),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+
 # ✅ UPDATED: Public leaderboard ignores hidden users
 
 
@@ -635,7 +1058,35 @@ def get_leaderboard():
         return jsonify([])
 
 
+def generate_roadmap(topic, mode):
+    prompt = f"""
+    Create a learning path for '{topic}' ({mode} mode).
+    Format: JSON Object with two keys: 'nodes' and 'flashcards'.
+    
+    1. 'nodes': List of {4 if mode == 'panic' else 7} steps (id, label).
+    2. 'flashcards': List of EXACTLY 5 key terms/definitions from this topic.
+       Format: {{ "front": "Term", "back": "Short Definition" }}
+    
+    Return strict JSON.
+    """
+
+    completion = groq_chat('roadmap', messages=[
+                           {"role": "user", "content": prompt}], temperature=0.1, response_format={"type": "json_object"})
+    data = parse_json_safely(completion.choices[0].message.content, "dict")
+
+    data, missing = llm_output.validate_roadmap(data)
+    if missing:
+        data = repair_roadmap(topic, mode, data, missing)
+    if not data['nodes']:
+        data['nodes'] = [{"id": "1", "label": f"{topic} Basics"}]
+    else:
+        cache_store.set('roadmap', cache_store.make_key(topic, mode),
+                        data, ttl=ROADMAP_CACHE_TTL)
+    return data
+
+
 @app.route('/api/roadmap', methods=['GET'])
+@rate_limited('llm')
 def get_roadmap():
     topic = request.args.get('topic', '').strip().title()
     mode = request.args.get('mode', 'standard')
@@ -643,56 +1094,38 @@ def get_roadmap():
 
     if user_id:
         try:
-            existing_user_map = supabase.table('user_roadmaps').select('graph_data').eq(
+            existing_user_map = supabase.table('user_roadmaps').select('graph_data, graph_hash').eq(
                 'user_id', user_id).eq('topic', topic).eq('mode', mode).limit(1).execute()
             if existing_user_map.data:
-                return jsonify(existing_user_map.data[0]['graph_data'])
+                graph = roadmap_store.resolve_row(
+                    supabase, existing_user_map.data[0])
+                if graph:
+                    return serve_roadmap(graph, topic, mode)
         except Exception as e:
             print(f"Error fetching user map: {e}")
 
+    cached = cache_store.get('roadmap', cache_store.make_key(topic, mode))
+    if cached:
+        llm_cache_hit('roadmap')
+        return serve_roadmap(cached, topic, mode)
+
     try:
         existing_general = supabase.table('user_roadmaps').select(
-            'graph_data').eq('topic', topic).eq('mode', mode).limit(1).execute()
+            'graph_data, graph_hash').eq('topic', topic).eq('mode', mode).limit(1).execute()
         if existing_general.data:
-            return jsonify(existing_general.data[0]['graph_data'])
+            graph = roadmap_store.resolve_row(supabase, existing_general.data[0])
+            if graph:
+                return serve_roadmap(graph, topic, mode)
     except:
         pass
 
-    prompt = f"""
-    Create a learning path for '{topic}' ({mode} mode).
-    Format: JSON Object with two keys: 'nodes' and 'flashcards'.
-    
-    1. 'nodes': List of {4 if mode == 'panic' else 7} steps (id, label).
-    2. 'flashcards': List of EXACTLY 5 key terms/definitions from this topic.
-       Format: {{ "front": "Term", "back": "Short Definition" }}
-    
-    Return strict JSON.
-    """
-
     try:
-        completion = groq_client.chat.completions.create(model=GROQ_MODEL, messages=[
-                                                         {"role": "user", "content": prompt}], temperature=0.1, response_format={"type": "json_object"})
-        data = parse_json_safely(completion.choices[0].message.content, "dict")
-
-        if not data:
-            data = {}
-        if 'nodes' not in data:
-            data['nodes'] = [{"id": "1", "label": f"{topic} Basics"}]
-        if 'flashcards' not in data:
-            data['flashcards'] = []
-
-        return jsonify(data)
+        return serve_roadmap(generate_roadmap(topic, mode), topic, mode)
     except:
         return jsonify({"nodes": [{"id": "1", "label": f"{topic} Basics"}], "flashcards": []})
 
 
-@app.route('/api/quiz', methods=['GET'])
-def get_quiz():
-    main = request.args.get('main_topic')
-    sub = request.args.get('sub_topic')
-    num = request.args.get('num', '10')
-    history = request.args.get('history', '')
-
+def generate_quiz(main, sub, num, history=''):
     difficulty_instruction = """
     DIFFICULTY: INTERMEDIATE to ADVANCED. 
     - Questions must be SCENARIO-BASED or CODE ANALYSIS (e.g., "What is the output?", "Find the bug", "Best pattern for...").
@@ -727,27 +1160,62 @@ def get_quiz():
         Return strict JSON Array: [{{ "question": "...", "options": ["A","B","C","D"], "correct_answer": 0 }}]
         """
 
+    completion = groq_chat(
+        'quiz',
+        token_budget.count_tokens(prompt),
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.2,
+        response_format={"type": "json_object"}
+    )
+    data = parse_json_safely(completion.choices[0].message.content, "list")
+
+    items, missing = llm_output.validate_quiz(data, num)
+    if missing:
+        items = repair_quiz(main, sub, items, missing)
+    if not items:
+        raise ValueError("no valid questions after repair")
+    return items
+
+
+def get_quiz_pool(main, sub):
+    # History-free quizzes are drawn from a shared per-node pool instead of a fresh LLM call
+    key = cache_store.make_key(main, sub)
+    pool = cache_store.get('quiz', key)
+    if pool is None:
+        pool = generate_quiz(main, sub, QUIZ_POOL_SIZE)
+        cache_store.set('quiz', key, pool, ttl=QUIZ_CACHE_TTL)
+    else:
+        llm_cache_hit('quiz')
+    return pool
+
+
+@app.route('/api/quiz', methods=['GET'])
+@rate_limited('llm')
+def get_quiz():
+    main = request.args.get('main_topic')
+    sub = request.args.get('sub_topic')
     try:
-        completion = groq_client.chat.completions.create(
-            model=GROQ_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2,
-            response_format={"type": "json_object"}
-        )
-        data = parse_json_safely(completion.choices[0].message.content, "list")
+        num = max(1, min(int(request.args.get('num', 10)), 25))
+    except ValueError:
+        num = 10
+    # Only the few prior topics most related to this node go into the prompt
+    history = token_budget.select_quiz_history(
+        request.args.get('history', ''), sub)
 
-        if isinstance(data, dict):
-            for k in data:
-                if isinstance(data[k], list):
-                    return jsonify(data[k])
+    try:
+        if not history and num <= QUIZ_POOL_SIZE:
+            pool = get_quiz_pool(main, sub)
+            if len(pool) >= num:
+                return jsonify(random.sample(pool, num))
 
-        return jsonify(data if data else [])
+        return jsonify(generate_quiz(main, sub, num, history))
     except Exception as e:
         print(f"Quiz Gen Error: {e}")
         return jsonify([{"question": "Error generating quiz. Please retry.", "options": ["OK"], "correct_answer": 0}])
 
 
 @app.route('/api/resources', methods=['GET'])
+@rate_limited('resources')
 def get_resources():
     search_query = request.args.get('search_query')
     topic_key = request.args.get('topic_key', '').strip().title()
@@ -782,16 +1250,36 @@ def get_resources():
     except Exception as e:
         print(f"⚠️ Sentiment Calc Error: {e}")
 
+    # Served instantly when the node was prefetched with its roadmap
+    bundle = resource_prefetcher.get(search_query, mode)
+
     return jsonify({
-        "videos": get_youtube_videos(search_query, mode),
-        "articles": scrape_articles(search_query, mode),
-        "pdfs": get_pdfs(search_query, mode),
+        "videos": bundle["videos"],
+        "articles": bundle["articles"],
+        "pdfs": bundle["pdfs"],
         "trust_score": trust_score,
         "satisfaction_level": satisfaction_level,
         "review_count": review_count
     })
 
 
+@app.route('/api/user_roadmaps', methods=['GET'])
+def get_user_roadmaps():
+    user_id = request.args.get('user_id')
+    try:
+        res = supabase.table('user_roadmaps').select(
+            '*').eq('user_id', user_id).execute()
+        graphs = roadmap_store.get_graphs(
+            supabase, [r.get('graph_hash') for r in res.data if r.get('graph_data') is None])
+        for row in res.data:
+            if row.get('graph_data') is None:
+                row['graph_data'] = graphs.get(row.get('graph_hash'))
+        return jsonify(res.data)
+    except Exception as e:
+        print(f"Error fetching user roadmaps: {e}")
+        return jsonify([])
+
+
 @app.route('/api/delete_roadmap', methods=['DELETE'])
 def delete_roadmap():
     try:
@@ -834,22 +1322,145 @@ def get_admin_stats():
             '*', count='exact').execute()
         total_roadmaps = roadmaps.count if roadmaps.count else len(
             roadmaps.data)
-        feedback = supabase.table('node_progress').select(
-            'sentiment_score').execute()
-        scores = [f['sentiment_score']
-                  for f in feedback.data if f['sentiment_score']]
-        avg_satisfaction = int(
-            ((sum(scores)/len(scores) + 1)/2)*100) if scores else 0
+        if progress_analytics:
+            progress_analytics.refresh()
+            avg_satisfaction = progress_analytics.overall_satisfaction()
+        else:
+            feedback = supabase.table('node_progress').select(
+                'sentiment_score').execute()
+            scores = [f['sentiment_score']
+                      for f in feedback.data if f['sentiment_score']]
+            avg_satisfaction = int(
+                ((sum(scores)/len(scores) + 1)/2)*100) if scores else 0
         return jsonify({"users": total_users, "roadmaps": total_roadmaps, "satisfaction": avg_satisfaction})
     except:
         return jsonify({"users": 0, "roadmaps": 0, "satisfaction": 0})
 
 
+@app.route('/api/admin/prefetch_stats', methods=['GET'])
+def get_prefetch_stats():
+    return jsonify(resource_prefetcher.stats())
+
+
+@app.route('/api/admin/cache_stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(cache_store.stats())
+
+
+@app.route('/api/admin/providers', methods=['GET'])
+def get_provider_health():
+    return jsonify(resilience.stats())
+
+
+@app.route('/api/admin/live_subscribers', methods=['GET'])
+def get_live_subscribers():
+    return jsonify(live_updates.stats())
+
+
+@app.route('/api/admin/profiling', methods=['GET', 'POST'])
+def admin_profiling():
+    if request.method == 'POST':
+        if not tracing.authorized(request.headers.get('X-Profile-Token')):
+            return jsonify({"error": "Invalid profiling token"}), 403
+        data = request.json or {}
+        return jsonify(tracing.configure(data.get('sample_rate'), data.get('mode')))
+    return jsonify(tracing.configure())
+
+
+@app.route('/api/admin/traces', methods=['GET'])
+def admin_list_traces():
+    if not tracing.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({"error": "Invalid profiling token"}), 403
+    return jsonify(tracing.list_traces())
+
+
+@app.route('/api/admin/traces/<trace_id>', methods=['GET'])
+def admin_get_trace(trace_id):
+    if not tracing.authorized(request.headers.get('X-Profile-Token')):
+        return jsonify({"error": "Invalid profiling token"}), 403
+    trace = tracing.get_trace(trace_id)
+    if not trace:
+        return jsonify({"error": "Trace not found (it may have rotated out)"}), 404
+    # ?format=folded -> collapsed stacks for flamegraph.pl / speedscope / inferno
+    if request.args.get('format') == 'folded':
+        return Response(trace.folded() + "\n", mimetype='text/plain')
+    return jsonify(trace.to_dict())
+
+
+@app.route('/api/admin/llm_usage', methods=['GET'])
+def get_llm_usage():
+    # ?by=route|caller|model&hours=24
+    try:
+        return jsonify(llm_usage.summary(request.args.get('by', 'route'),
+                                         int(request.args.get('hours', 24)),
+                                         int(request.args.get('limit', 50))))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/api/admin/rate_limits', methods=['GET'])
+def get_rate_limit_stats():
+    return jsonify(rate_limiter.stats())
+
+# ✅ NEW: Topic difficulty / satisfaction rollups over node_progress
+
+
+def analytics_ready():
+    if not progress_analytics:
+        return False
+    progress_analytics.refresh(force=request.args.get('refresh') == '1')
+    return True
+
+
+@app.route('/api/admin/analytics/topics', methods=['GET'])
+def admin_analytics_topics():
+    try:
+        if not analytics_ready():
+            return jsonify({"error": "Analytics unavailable (numpy missing)"}), 503
+        return jsonify(progress_analytics.topic_stats())
+    except Exception as e:
+        print(f"❌ Analytics Error: {e}")
+        return jsonify([])
+
+
+@app.route('/api/admin/analytics/nodes', methods=['GET'])
+def admin_analytics_nodes():
+    try:
+        if not analytics_ready():
+            return jsonify({"error": "Analytics unavailable (numpy missing)"}), 503
+        return jsonify(progress_analytics.node_stats(request.args.get('topic')))
+    except Exception as e:
+        print(f"❌ Analytics Error: {e}")
+        return jsonify([])
+
+
+@app.route('/api/admin/analytics/sentiment_trend', methods=['GET'])
+def admin_analytics_trend():
+    window = request.args.get('window', 'day')
+    if window not in ('day', 'week', 'month'):
+        return jsonify({"error": "window must be day, week or month"}), 400
+    try:
+        if not analytics_ready():
+            return jsonify({"error": "Analytics unavailable (numpy missing)"}), 503
+        return jsonify(progress_analytics.sentiment_trend(window, request.args.get('topic')))
+    except Exception as e:
+        print(f"❌ Analytics Error: {e}")
+        return jsonify([])
+
+
+@app.route('/api/admin/analytics/status', methods=['GET'])
+def admin_analytics_status():
+    if not analytics_ready():
+        return jsonify({"error": "Analytics unavailable (numpy missing)"}), 503
+    return jsonify(progress_analytics.summary())
+
+
 @app.route('/api/admin/roadmaps', methods=['GET'])
 def get_admin_roadmaps():
     try:
+        # Admin list never renders the graph, so skip the payload columns entirely
         res = supabase.table('user_roadmaps').select(
-            '*').order('created_at', desc=True).limit(30).execute()
+            'id, user_id, topic, mode, graph_hash, created_at').order('created_at', desc=True).limit(30).execute()
         return jsonify(res.data)
     except:
         return jsonify([])
@@ -864,6 +1475,40 @@ def get_admin_feedback():
     except:
         return jsonify([])
 
+# ✅ NEW: Stream full tables out as NDJSON / CSV (constant memory, keyset paged)
+
+
+@app.route('/api/admin/export/<table>', methods=['GET'])
+def admin_export(table):
+    if table not in export.EXPORT_TABLES:
+        return jsonify({"error": f"Unknown table. Use one of: {', '.join(export.EXPORT_TABLES)}"}), 404
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    rows = export.iter_rows(
+        supabase, table,
+        start=request.args.get('start'),
+        end=request.args.get('end'),
+        topic=request.args.get('topic')
+    )
+
+    def generate():
+        try:
+            yield from (export.csv_lines(rows) if fmt == 'csv' else export.ndjson_lines(rows))
+        except Exception as e:
+            # Headers are already sent, so the best we can do is end the stream visibly
+            print(f"Export Error ({table}): {e}")
+            yield f"\n# export aborted: {e}\n"
+
+    stamp = datetime.utcnow().strftime('%Y%m%d')
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={"Content-Disposition": f"attachment; filename={table}-{stamp}.{fmt}"}
+    )
+
 # ✅ UPDATED: Fetch ALL users for admin, even hidden ones
 
 
@@ -887,6 +1532,7 @@ def admin_hide_user():
     try:
         supabase.table('leaderboard').update(
             {"is_hidden": is_hidden}).eq('user_id', user_id).execute()
+        live_updates.publish('leaderboard')
         return jsonify({"message": f"User hidden status updated to {is_hidden}"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -906,6 +1552,10 @@ def admin_delete_user():
             'user_id', user_id).execute()
         supabase.table('saved_resources').delete().eq(
             'user_id', user_id).execute()
+        live_updates.publish('leaderboard', 'squads')
+        # Analytics only loads new rows incrementally; drop its copy so deletions count
+        if progress_analytics:
+            progress_analytics.reset()
         return jsonify({"message": "User data completely wiped"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -934,6 +1584,7 @@ def admin_delete_squad():
             {"squad_id": None}).eq('squad_id', squad_id).execute()
         # Then delete the squad itself
         supabase.table('squads').delete().eq('id', squad_id).execute()
+        live_updates.publish('squads', 'leaderboard', f"squad:{squad_id}")
         return jsonify({"message": "Squad disbanded"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -945,11 +1596,22 @@ def admin_delete_squad():
 def admin_delete_roadmap():
     try:
         roadmap_id = request.args.get('id')
+        row = supabase.table('user_roadmaps').select('topic, mode').eq(
+            'id', roadmap_id).limit(1).execute().data
         supabase.table('user_roadmaps').delete().eq('id', roadmap_id).execute()
+        # Otherwise get_roadmap keeps serving the generated copy for up to 7 days
+        if row:
+            cache_store.delete('roadmap', cache_store.make_key(
+                row[0]['topic'], row[0].get('mode') or 'standard'))
         return jsonify({"message": "Deleted by Admin"})
     except:
         return jsonify({"error": "Failed"}), 500
 
 
+# Every helper above gets a span when the current request is being traced
+tracing.instrument(globals(), skip=set(app.view_functions.values()) | {
+    start_trace, finish_trace, start_outbox_worker, rate_limited})
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
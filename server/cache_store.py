@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+# --- CACHE STORE ---
+# Two tiers: a per-process LRU in front of a shared backend that every gunicorn
+# worker on the host (or cluster, with Redis) can read. Values are JSON, grouped by
+# namespace ('search_term', 'roadmap', 'quiz', 'resources', ...) with optional TTLs.
+#
+#   CACHE_BACKEND=sqlite (default) | redis | memory
+#   CACHE_DB_PATH=./cache.db          CACHE_REDIS_URL=redis://localhost:6379/0
+#   CACHE_LRU_SIZE=2000               CACHE_MAX_ROWS=5000 (per namespace, shared tier)
+
+DB_PATH = os.environ.get("CACHE_DB_PATH", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "cache.db"))
+# Max lifetime of a local-tier copy when a shared tier exists (bounds cross-worker staleness)
+LOCAL_TTL = int(os.environ.get("CACHE_LOCAL_TTL", 300))
+
+
+class LRUBackend:
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # (namespace, key) -> (expires_at, value)
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.time():
+                del self._data[(namespace, key)]
+                return None
+            self._data.move_to_end((namespace, key))
+            return entry[1]
+
+    def set(self, namespace, key, value, expires_at=None):
+        with self._lock:
+            self._data[(namespace, key)] = (expires_at, value)
+            self._data.move_to_end((namespace, key))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    def count(self):
+        counts = defaultdict(int)
+        with self._lock:
+            for namespace, _ in self._data:
+                counts[namespace] += 1
+        return dict(counts)
+
+
+class SQLiteBackend:
+    def __init__(self, path, max_rows=5000):
+        self.path = path
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    written_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )""")
+            try:
+                # cache.db files created before the size cap existed lack this column
+                conn.execute("ALTER TABLE cache ADD COLUMN written_at REAL")
+            except sqlite3.OperationalError:
+                pass
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key)).fetchone()
+        if not row:
+            return None
+        if row[1] is not None and row[1] < time.time():
+            self.delete(namespace, key)
+            return None
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value, expires_at=None):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, written_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), expires_at, time.time()))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune(namespace)
+
+    def prune(self, namespace):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                     (time.time(),))
+        conn.execute("""
+            DELETE FROM cache WHERE namespace = ? AND key IN (
+                SELECT key FROM cache WHERE namespace = ?
+                ORDER BY written_at DESC LIMIT -1 OFFSET ?)""",
+                     (namespace, namespace, self.max_rows))
+
+    def delete(self, namespace, key):
+        self._conn().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def count(self):
+        rows = self._conn().execute(
+            "SELECT namespace, COUNT(*) FROM cache WHERE expires_at IS NULL OR expires_at > ? GROUP BY namespace",
+            (time.time(),)).fetchall()
+        return dict(rows)
+
+
+class RedisBackend:
+    # Any Redis-protocol server works here (redis, valkey, a local stand-in...)
+    def __init__(self, url, max_rows=5000):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.max_rows = max_rows
+
+    def _k(self, namespace, key):
+        return f"smh:{namespace}:{key}"
+
+    def get(self, namespace, key):
+        raw = self.client.get(self._k(namespace, key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, namespace, key, value, expires_at=None):
+        ttl = max(1, int(expires_at - time.time())) if expires_at else None
+        pipe = self.client.pipeline()
+        pipe.set(self._k(namespace, key), json.dumps(value), ex=ttl)
+        # Track insertion order per namespace so the size cap can evict the oldest keys
+        pipe.zadd(f"smh:{namespace}:__index__", {key: time.time()})
+        pipe.execute()
+        overflow = self.client.zcard(
+            f"smh:{namespace}:__index__") - self.max_rows
+        if overflow > 0:
+            old = self.client.zpopmin(f"smh:{namespace}:__index__", overflow)
+            self.client.delete(*[self._k(namespace, k.decode())
+                               for k, _ in old])
+
+    def delete(self, namespace, key):
+        self.client.delete(self._k(namespace, key))
+        self.client.zrem(f"smh:{namespace}:__index__", key)
+
+    def count(self):
+        counts = {}
+        for idx in self.client.scan_iter("smh:*:__index__"):
+            counts[idx.decode().split(':')[1]] = self.client.zcard(idx)
+        return counts
+
+
+class TieredCache:
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._stats = defaultdict(
+            lambda: {"hits_local": 0, "hits_shared": 0, "misses": 0, "sets": 0, "errors": 0})
+
+    def _bump(self, namespace, field):
+        with self._lock:
+            self._stats[namespace][field] += 1
+
+    def get(self, namespace, key):
+        value = self.local.get(namespace, key)
+        if value is not None:
+            self._bump(namespace, "hits_local")
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(namespace, key)
+            except Exception as e:
+                print(f"⚠️ Cache Read Error: {e}")
+                self._bump(namespace, "errors")
+                value = None
+            if value is not None:
+                self._bump(namespace, "hits_shared")
+                # No TTL knowledge here, so keep the promoted copy short-lived
+                self.local.set(namespace, key, value, time.time() + LOCAL_TTL)
+                return value
+        self._bump(namespace, "misses")
+        return None
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        local_expires = expires_at
+        if self.shared is not None:
+            # delete() only reaches this worker's local tier, so other workers' copies
+            # must age out quickly; the shared tier keeps the full TTL
+            local_expires = min(expires_at or float('inf'), time.time() + LOCAL_TTL)
+        self.local.set(namespace, key, value, local_expires)
+        self._bump(namespace, "sets")
+        if self.shared is not None:
+            try:
+                self.shared.set(namespace, key, value, expires_at)
+            except Exception as e:
+                print(f"⚠️ Cache Write Error: {e}")
+                self._bump(namespace, "errors")
+
+    def delete(self, namespace, key):
+        self.local.delete(namespace, key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(namespace, key)
+            except Exception as e:
+                print(f"⚠️ Cache Delete Error: {e}")
+
+    def count(self):
+        backend = self.shared if self.shared is not None else self.local
+        try:
+            return backend.count()
+        except Exception:
+            return self.local.count()
+
+    def stats(self):
+        with self._lock:
+            snapshot = {ns: dict(s) for ns, s in self._stats.items()}
+        for s in snapshot.values():
+            lookups = s["hits_local"] + s["hits_shared"] + s["misses"]
+            s["hit_rate"] = round(
+                (s["hits_local"] + s["hits_shared"]) / lookups, 3) if lookups else None
+        return {"namespaces": snapshot, "entries": self.count(), "local_entries": self.local.count()}
+
+
+def create_cache():
+    local = LRUBackend(int(os.environ.get("CACHE_LRU_SIZE", 2000)))
+    kind = os.environ.get("CACHE_BACKEND", "sqlite")
+    max_rows = int(os.environ.get("CACHE_MAX_ROWS", 5000))
+    shared = None
+    try:
+        if kind == "redis":
+            shared = RedisBackend(os.environ.get(
+                "CACHE_REDIS_URL", "redis://localhost:6379/0"), max_rows)
+        elif kind == "sqlite":
+            shared = SQLiteBackend(DB_PATH, max_rows)
+    except Exception as e:
+        print(f"⚠️ Shared cache unavailable ({kind}), using in-process LRU only: {e}")
+    return TieredCache(local, shared)
+
+
+_cache = create_cache()
+
+
+def make_key(*parts):
+    return "|".join(" ".join(str(p or '').lower().split()) for p in parts)
+
+
+def get(namespace, key):
+    return _cache.get(namespace, key)
+
+
+def set(namespace, key, value, ttl=None):
+    _cache.set(namespace, key, value, ttl)
+
+
+def delete(namespace, key):
+    _cache.delete(namespace, key)
+
+
+def count(namespace=None):
+    counts = _cache.count()
+    return counts.get(namespace, 0) if namespace else counts
+
+
+def stats():
+    return _cache.stats()
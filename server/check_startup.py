@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import subprocess
+import statistics
+
+from profile_imports import parse_importtime, run_importtime
+
+# Startup-time regression check: fails (exit 1) if a cold `import app` goes over
+# budget, or if one of the heavy SDKs that routes load lazily sneaks back in at import.
+#
+#   python check_startup.py
+#   STARTUP_BUDGET_MS=800 python check_startup.py
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 1500))
+RUNS = int(os.environ.get("STARTUP_RUNS", 3))
+LAZY_MODULES = ['supabase', 'groq', 'googleapiclient',
+                'textblob', 'bs4', 'duckduckgo_search', 'httplib2', 'requests',
+                'numpy']
+
+
+def cold_import_ms():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import app'],
+                   cwd=HERE, check=True, capture_output=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def baseline_ms():
+    # Interpreter start-up alone, so the budget only measures our own imports
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == '__main__':
+    failures = []
+
+    loaded = {r['module'].split('.')[0]
+              for r in parse_importtime(run_importtime('app'))}
+    eager = sorted(m for m in LAZY_MODULES if m in loaded)
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+
+    base = statistics.median(baseline_ms() for _ in range(RUNS))
+    cost = statistics.median(cold_import_ms() for _ in range(RUNS)) - base
+    print(f"⏱️  Cold import of app: {cost:.0f} ms (budget {BUDGET_MS:.0f} ms, median of {RUNS})")
+    if cost > BUDGET_MS:
+        failures.append(f"cold import took {cost:.0f} ms > {BUDGET_MS:.0f} ms budget")
+
+    if failures:
+        for f in failures:
+            print(f"❌ {f}")
+        sys.exit(1)
+    print("✅ Startup within budget.")
@@ -0,0 +1,57 @@
+import io
+import csv
+import json
+
+# --- STREAMING EXPORTS ---
+# Admin exports page through a table with keyset pagination (id > last_id) and yield
+# encoded rows as they arrive, so memory stays flat no matter how big the table is.
+
+PAGE_SIZE = 1000
+
+# table -> (columns to select, column used by the `topic` filter)
+EXPORT_TABLES = {
+    'node_progress': ('*', 'topic'),
+    'saved_resources': ('*', 'roadmap_topic'),
+    'user_roadmaps': ('id, user_id, topic, mode, graph_hash, created_at', 'topic'),
+}
+
+
+def iter_rows(supabase, table, start=None, end=None, topic=None, page_size=PAGE_SIZE):
+    columns, topic_column = EXPORT_TABLES[table]
+    last_id = None
+    while True:
+        query = supabase.table(table).select(columns)
+        if start:
+            query = query.gte('created_at', start)
+        if end:
+            query = query.lt('created_at', end)
+        if topic:
+            query = query.eq(topic_column, topic.strip().title())
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.order('id').limit(page_size).execute().data
+        if not page:
+            return
+        yield from page
+        # Only an empty page ends the export; the server may cap pages below page_size
+        last_id = page[-1]['id']
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(
+                buffer, fieldnames=list(row.keys()), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow({k: json.dumps(v) if isinstance(v, (dict, list)) else v
+                         for k, v in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
@@ -0,0 +1,32 @@
+import threading
+
+# --- LAZY CLIENTS ---
+# Heavy SDKs (supabase, groq, googleapiclient) are only imported and constructed the
+# first time a route actually touches them, which keeps gunicorn boot / worker respawn
+# fast. LazyClient forwards attribute access to the real client once it exists.
+
+
+class LazyClient:
+    def __init__(self, factory, name):
+        self._factory = factory
+        self._name = name
+        self._lock = threading.Lock()
+        self._instance = None
+        self._ready = False
+
+    def _get(self):
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._instance = self._factory()
+                    self._ready = True
+        return self._instance
+
+    def __getattr__(self, attr):
+        instance = self._get()
+        if instance is None:
+            raise RuntimeError(f"{self._name} client is not configured")
+        return getattr(instance, attr)
+
+    def __bool__(self):
+        return self._get() is not None
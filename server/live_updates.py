@@ -0,0 +1,189 @@
+import os
+import json
+import queue
+import re
+import threading
+import time
+
+# --- LIVE RANK UPDATES (SSE) ---
+# Writers call publish(channel) after a score / squad change. Publishing only marks
+# the channel dirty; a flusher thread reloads each dirty channel at most once per
+# COALESCE_SECONDS, diffs it against the last snapshot and pushes the diff to every
+# subscriber. A burst of quiz submissions therefore costs one query and one event.
+#
+# Channels: 'leaderboard', 'squads', 'squad:<id>'. Loaders are registered per prefix
+# and return the ranked rows for a channel.
+
+COALESCE_SECONDS = 2
+# Channels with subscribers are also re-read on this interval, which picks up changes
+# published by other gunicorn workers.
+REFRESH_SECONDS = 20
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE = 50
+# Each open stream pins a gthread thread for its whole life; keep most of the pool
+# (16 threads, see Procfile) free for normal requests.
+MAX_STREAMS = int(os.environ.get("LIVE_MAX_STREAMS", 6))
+
+_loaders = {}           # prefix -> (loader([arg]) -> rows, key field, takes an id)
+_snapshots = {}         # channel -> {"rows": [...], "at": ts}
+_dirty = set()
+_subscribers = {}       # channel -> set(Queue)
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_flusher = {"thread": None}
+_streams = {"open": 0}
+
+
+_CHANNEL_ARG = re.compile(r'^[\w-]{1,64}$')
+
+
+def register(prefix, key_field, takes_id=False):
+    def decorator(fn):
+        _loaders[prefix] = (fn, key_field, takes_id)
+        return fn
+    return decorator
+
+
+def _load(channel):
+    prefix, _, arg = channel.partition(':')
+    fn, key_field, takes_id = _loaders[prefix]
+    return (fn(arg) if takes_id else fn()), key_field
+
+
+def diff(old_rows, new_rows, key_field):
+    old = {r[key_field]: r for r in old_rows or []}
+    new = {r[key_field]: r for r in new_rows}
+    return {
+        "upserts": [r for k, r in new.items() if old.get(k) != r],
+        "removed": [k for k in old if k not in new],
+        "order": [r[key_field] for r in new_rows],
+        "key": key_field
+    }
+
+
+def publish(*channels):
+    with _lock:
+        _dirty.update(c for c in channels if c)
+    _ensure_flusher()
+    _wakeup.set()
+
+
+def _broadcast(channel, payload):
+    message = f"event: {channel}\ndata: {json.dumps(payload, default=str)}\n\n"
+    with _lock:
+        targets = list(_subscribers.get(channel, ()))
+    for q in targets:
+        try:
+            q.put_nowait(message)
+        except queue.Full:
+            # Slow client: cut it off, EventSource reconnects and gets a fresh snapshot
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+            q.put_nowait(None)
+
+
+def _refresh(channel):
+    try:
+        rows, key_field = _load(channel)
+    except Exception as e:
+        print(f"⚠️ Live update load failed ({channel}): {e}")
+        return
+    previous = _snapshots.get(channel)
+    _snapshots[channel] = {"rows": rows, "at": time.time()}
+    if previous is None:
+        return
+    change = diff(previous["rows"], rows, key_field)
+    if change["upserts"] or change["removed"] or change["order"] != [r[key_field] for r in previous["rows"]]:
+        _broadcast(channel, {"type": "diff", **change})
+
+
+def _run():
+    while True:
+        _wakeup.wait(REFRESH_SECONDS)
+        _wakeup.clear()
+        time.sleep(COALESCE_SECONDS)  # let the burst pile up
+        now = time.time()
+        with _lock:
+            channels = set(_dirty)
+            _dirty.clear()
+            for channel in _subscribers:
+                snap = _snapshots.get(channel)
+                if not snap or now - snap["at"] >= REFRESH_SECONDS:
+                    channels.add(channel)
+        for channel in channels:
+            # Nobody listening: just drop the stale snapshot
+            if channel not in _subscribers:
+                _snapshots.pop(channel, None)
+                continue
+            _refresh(channel)
+
+
+def _ensure_flusher():
+    with _lock:
+        if _flusher["thread"] is None or not _flusher["thread"].is_alive():
+            _flusher["thread"] = threading.Thread(
+                target=_run, name='live-updates', daemon=True)
+            _flusher["thread"].start()
+
+
+def subscribe(channels):
+    """Generator of SSE messages: a snapshot per channel, then diffs and heartbeats."""
+    q = queue.Queue(maxsize=SUBSCRIBER_QUEUE)
+    with _lock:
+        _streams["open"] += 1
+        for channel in channels:
+            _subscribers.setdefault(channel, set()).add(q)
+    _ensure_flusher()
+
+    try:
+        yield "retry: 5000\n\n"
+        for channel in channels:
+            snap = _snapshots.get(channel)
+            if snap is None:
+                rows, _ = _load(channel)
+                snap = {"rows": rows, "at": time.time()}
+                _snapshots[channel] = snap
+            key_field = _loaders[channel.partition(':')[0]][1]
+            yield f"event: {channel}\ndata: {json.dumps({'type': 'snapshot', 'rows': snap['rows'], 'key': key_field}, default=str)}\n\n"
+
+        while True:
+            try:
+                message = q.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        with _lock:
+            _streams["open"] -= 1
+            for channel in channels:
+                subs = _subscribers.get(channel)
+                if subs:
+                    subs.discard(q)
+                    if not subs:
+                        del _subscribers[channel]
+
+
+def is_valid_channel(channel):
+    # 'squad:<id>' needs an id; 'leaderboard' / 'squads' take none
+    prefix, sep, arg = channel.partition(':')
+    if prefix not in _loaders:
+        return False
+    if _loaders[prefix][2]:
+        return bool(_CHANNEL_ARG.match(arg))
+    return not sep
+
+
+def at_capacity():
+    return _streams["open"] >= MAX_STREAMS
+
+
+def stats():
+    with _lock:
+        return {"streams": _streams["open"], "max_streams": MAX_STREAMS,
+                "channels": {c: len(s) for c, s in _subscribers.items()}}
@@ -0,0 +1,177 @@
+import re
+import json
+
+# --- STRUCTURED LLM OUTPUT ---
+# Lenient JSON extraction (with recovery of truncated payloads) plus light schema
+# validation for the roadmap, quiz and flashcard shapes. Validators return what was
+# usable *and* what is missing, so callers can ask the model for just the gap.
+
+_FENCE_RE = re.compile(r'```(?:json)?')
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def recover_partial(text):
+    """Cut a truncated JSON document back to its last complete element and close it."""
+    stack = []
+    in_string = False
+    escaped = False
+    safe_end, safe_stack = None, None
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch in '}]':
+            if not stack or _CLOSERS[stack[-1]] != ch:
+                break
+            stack.pop()
+            safe_end, safe_stack = i + 1, list(stack)
+            if not stack:
+                return text[:i + 1]
+        elif ch == ',' and stack:
+            safe_end, safe_stack = i, list(stack)
+
+    if safe_end is None:
+        return None
+    return text[:safe_end] + ''.join(_CLOSERS[c] for c in reversed(safe_stack))
+
+
+def loads_lenient(text, expected_type="dict"):
+    if not text:
+        return None
+    # Fast path: JSON mode usually hands back a clean document
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    text = _FENCE_RE.sub('', text).strip()
+    opener = '[' if expected_type == "list" else '{'
+    start = text.find(opener)
+    if start == -1:
+        start = min((p for p in (text.find('{'), text.find('[')) if p != -1), default=-1)
+    if start == -1:
+        return None
+    body = text[start:]
+
+    end = body.rfind(_CLOSERS[body[0]])
+    candidates = []
+    if end != -1:
+        candidates.append(body[:end + 1])
+    recovered = recover_partial(body)
+    if recovered:
+        candidates.append(recovered)
+
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA_RE.sub(r'\1', candidate)):
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                continue
+    return None
+
+
+def find_list(data, preferred_keys=()):
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for k in preferred_keys:
+            if isinstance(data.get(k), list):
+                return data[k]
+        for v in data.values():
+            if isinstance(v, list):
+                return v
+    return []
+
+
+# --- VALIDATORS ---
+
+
+def clean_quiz_item(item):
+    if not isinstance(item, dict):
+        return None
+    question = item.get('question')
+    options = item.get('options')
+    answer = item.get('correct_answer', item.get('answer'))
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) < 2:
+        return None
+    options = [str(o) for o in options]
+
+    # Models sometimes answer with "B", "2" or the option text itself
+    if isinstance(answer, str):
+        a = answer.strip()
+        if a.isdigit():
+            answer = int(a)
+        elif len(a) == 1 and a.upper() in 'ABCDEFGH':
+            answer = ord(a.upper()) - ord('A')
+        elif a in options:
+            answer = options.index(a)
+    if isinstance(answer, bool) or not isinstance(answer, int) or not 0 <= answer < len(options):
+        return None
+    return {"question": question.strip(), "options": options, "correct_answer": answer}
+
+
+def validate_quiz(data, want):
+    items = []
+    seen = set()
+    for raw in find_list(data, ('questions', 'quiz', 'assessment')):
+        item = clean_quiz_item(raw)
+        if item and item['question'] not in seen:
+            seen.add(item['question'])
+            items.append(item)
+    items = items[:want]
+    return items, want - len(items)
+
+
+def validate_flashcards(data):
+    cards = []
+    for raw in find_list(data, ('flashcards', 'cards')):
+        if isinstance(raw, dict):
+            front, back = raw.get('front') or raw.get('term'), raw.get(
+                'back') or raw.get('definition')
+            if isinstance(front, str) and isinstance(back, str) and front.strip() and back.strip():
+                cards.append({"front": front.strip(), "back": back.strip()})
+    return cards
+
+
+def validate_nodes(data):
+    nodes = []
+    for i, raw in enumerate(find_list(data, ('nodes', 'steps'))):
+        if isinstance(raw, str):
+            raw = {"label": raw}
+        if not isinstance(raw, dict):
+            continue
+        label = raw.get('label') or raw.get('title') or raw.get('name')
+        if isinstance(label, str) and label.strip():
+            nodes.append({"id": str(raw.get('id', i + 1)),
+                         "label": label.strip()})
+    return nodes
+
+
+def validate_roadmap(data, want_flashcards=5):
+    data = data if isinstance(data, dict) else {}
+    nodes = validate_nodes(data)
+    cards = validate_flashcards({"flashcards": data.get('flashcards', [])})
+
+    missing = []
+    if not nodes:
+        missing.append('nodes')
+    if len(cards) < want_flashcards:
+        missing.append('flashcards')
+
+    roadmap = dict(data)
+    roadmap['nodes'] = nodes
+    roadmap['flashcards'] = cards[:want_flashcards]
+    return roadmap, missing
@@ -0,0 +1,181 @@
+import os
+import time
+import atexit
+import sqlite3
+import threading
+
+# --- LLM USAGE ACCOUNTING ---
+# Every Groq call (and every cache hit that stood in for one) is counted in memory per
+# (hour, route, caller, model). A background thread adds the counters into a local
+# SQLite file every FLUSH_SECONDS, so the request path never waits on a write and all
+# gunicorn workers end up in the same table.
+
+DB_PATH = os.environ.get("LLM_USAGE_DB", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "llm_usage.db"))
+FLUSH_SECONDS = int(os.environ.get("LLM_USAGE_FLUSH_SECONDS", 30))
+
+# USD per million tokens: (prompt, completion). GROQ_PRICES="model=0.59/0.79,..." overrides.
+PRICES = {'llama-3.3-70b-versatile': (0.59, 0.79)}
+for _entry in filter(None, os.environ.get("GROQ_PRICES", "").split(',')):
+    _model, _, _price = _entry.partition('=')
+    _in, _, _out = _price.partition('/')
+    PRICES[_model.strip()] = (float(_in), float(_out or _in))
+
+COUNTERS = ('calls', 'cache_hits', 'errors', 'prompt_tokens',
+            'completion_tokens', 'latency_ms')
+GROUPS = ('route', 'caller', 'model')
+
+_pending = {}       # (hour, route, caller, model) -> {counter: value, "max_latency_ms": ...}
+_lock = threading.Lock()
+_local = threading.local()
+_flusher = {"pid": None, "thread": None, "last_flush": None, "last_error": None}
+
+
+def _conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_usage (
+                hour INTEGER NOT NULL,
+                route TEXT NOT NULL,
+                caller TEXT NOT NULL,
+                model TEXT NOT NULL,
+                calls INTEGER DEFAULT 0,
+                cache_hits INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                latency_ms REAL DEFAULT 0,
+                max_latency_ms REAL DEFAULT 0,
+                PRIMARY KEY (hour, route, caller, model)
+            )""")
+        _local.conn = conn
+    return conn
+
+
+def record(route, caller, model, usage=None, latency_ms=0.0, cached=False, error=False):
+    key = (int(time.time() // 3600) * 3600, route, caller or 'system', model or '')
+    with _lock:
+        entry = _pending.setdefault(key, dict.fromkeys(COUNTERS + ('max_latency_ms',), 0))
+        if cached:
+            entry['cache_hits'] += 1
+        else:
+            entry['calls'] += 1
+            entry['errors'] += int(error)
+            entry['latency_ms'] += latency_ms
+            entry['max_latency_ms'] = max(entry['max_latency_ms'], latency_ms)
+        if usage is not None:
+            entry['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+            entry['completion_tokens'] += getattr(usage, 'completion_tokens', 0) or 0
+    _ensure_flusher()
+
+
+def flush():
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+    columns = ', '.join(COUNTERS)
+    updates = ', '.join(f"{c} = {c} + excluded.{c}" for c in COUNTERS)
+    conn = _conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(f"""
+            INSERT INTO llm_usage (hour, route, caller, model, {columns}, max_latency_ms)
+            VALUES (?, ?, ?, ?, {', '.join('?' * len(COUNTERS))}, ?)
+            ON CONFLICT (hour, route, caller, model) DO UPDATE SET {updates},
+                max_latency_ms = MAX(max_latency_ms, excluded.max_latency_ms)
+        """, [key + tuple(e[c] for c in COUNTERS) + (e['max_latency_ms'],)
+              for key, e in batch.items()])
+        conn.execute("COMMIT")
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        # Put the counters back so the next flush retries them
+        with _lock:
+            for key, e_old in batch.items():
+                entry = _pending.setdefault(key, dict.fromkeys(COUNTERS + ('max_latency_ms',), 0))
+                for c in COUNTERS:
+                    entry[c] += e_old[c]
+                entry['max_latency_ms'] = max(entry['max_latency_ms'], e_old['max_latency_ms'])
+        _flusher["last_error"] = str(e)
+        print(f"⚠️ LLM usage flush failed: {e}")
+        return 0
+    _flusher["last_flush"] = time.time()
+    return len(batch)
+
+
+def _run():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush()
+
+
+def _ensure_flusher():
+    # Threads don't survive gunicorn's fork, so (re)start per process
+    if _flusher["pid"] == os.getpid() and _flusher["thread"].is_alive():
+        return
+    with _lock:
+        if _flusher["pid"] == os.getpid() and _flusher["thread"].is_alive():
+            return
+        thread = threading.Thread(target=_run, name='llm-usage-flush', daemon=True)
+        thread.start()
+        _flusher.update(pid=os.getpid(), thread=thread)
+
+
+atexit.register(flush)
+
+
+def cost_usd(model, prompt_tokens, completion_tokens):
+    price_in, price_out = PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def summary(group_by='route', hours=24, limit=50):
+    """Totals per route / caller / model, most expensive first."""
+    if group_by not in GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUPS)}")
+    flush()
+    since = int(time.time() // 3600 - hours) * 3600
+    rows = _conn().execute(f"""
+        SELECT {group_by}, model, SUM(calls), SUM(cache_hits), SUM(errors),
+               SUM(prompt_tokens), SUM(completion_tokens), SUM(latency_ms), MAX(max_latency_ms)
+        FROM llm_usage WHERE hour >= ? GROUP BY {group_by}, model
+    """, (since,)).fetchall()
+
+    groups = {}
+    for name, model, calls, hits, errors, p_tok, c_tok, latency, max_latency in rows:
+        g = groups.setdefault(name, {
+            group_by: name, "calls": 0, "cache_hits": 0, "errors": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+            "_latency": 0.0, "max_latency_ms": 0.0})
+        g["calls"] += calls
+        g["cache_hits"] += hits
+        g["errors"] += errors
+        g["prompt_tokens"] += p_tok
+        g["completion_tokens"] += c_tok
+        g["cost_usd"] += cost_usd(model, p_tok, c_tok)
+        g["_latency"] += latency
+        g["max_latency_ms"] = max(g["max_latency_ms"], max_latency)
+
+    out = []
+    for g in groups.values():
+        calls = g["calls"]
+        served = calls + g["cache_hits"]
+        avg_cost = g["cost_usd"] / calls if calls else 0.0
+        g.update({
+            "avg_latency_ms": round(g.pop("_latency") / calls, 1) if calls else None,
+            "max_latency_ms": round(g["max_latency_ms"], 1),
+            "cache_hit_rate": round(g["cache_hits"] / served, 3) if served else None,
+            "avg_cost_usd": round(avg_cost, 6),
+            # What the hits would have cost as real calls
+            "saved_by_cache_usd": round(avg_cost * g["cache_hits"], 4),
+            "cost_usd": round(g["cost_usd"], 4),
+        })
+        out.append(g)
+    out.sort(key=lambda g: g["cost_usd"], reverse=True)
+    return {"group_by": group_by, "hours": hours, "rows": out[:limit],
+            "last_flush": _flusher["last_flush"], "last_error": _flusher["last_error"]}
@@ -0,0 +1,137 @@
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+from supabase import create_client
+
+from roadmap_store import BLOB_TABLE, canonical_json, graph_hash, pack_graph, put_graph
+
+# Moves inline `user_roadmaps.graph_data` into the content-addressed `roadmap_blobs`
+# table and reports how much storage / transfer the dedup + compression saves.
+#
+#   python migrate_roadmaps.py --dry-run      # measure only
+#   python migrate_roadmaps.py                # migrate and clear inline graph_data
+#   python migrate_roadmaps.py --keep-inline  # migrate but leave graph_data in place
+#   python migrate_roadmaps.py --gc           # delete blobs no row references
+
+PAGE_SIZE = 500
+
+
+def fmt_bytes(n):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def iter_inline_rows(supabase):
+    last_id = None
+    while True:
+        query = supabase.table('user_roadmaps').select(
+            'id, graph_data').not_.is_('graph_data', 'null').order('id').limit(PAGE_SIZE)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.execute().data
+        if not page:
+            return
+        yield from page
+        last_id = page[-1]['id']
+
+
+def migrate(supabase, dry_run=False, keep_inline=False):
+    rows = 0
+    raw_total = 0
+    unique = {}
+
+    for row in iter_inline_rows(supabase):
+        graph = row['graph_data']
+        raw = len(canonical_json(graph).encode('utf-8'))
+        rows += 1
+        raw_total += raw
+
+        if dry_run:
+            h = graph_hash(graph)
+        else:
+            h = put_graph(supabase, graph)
+            update = {"graph_hash": h}
+            if not keep_inline:
+                update["graph_data"] = None
+            supabase.table('user_roadmaps').update(
+                update).eq('id', row['id']).execute()
+        unique[h] = graph
+
+    packed_total = sum(len(pack_graph(g)) for g in unique.values())
+    unique_raw = sum(len(canonical_json(g).encode('utf-8'))
+                     for g in unique.values())
+    # Each row still carries its 64-char hash reference.
+    ref_total = rows * 64
+
+    print(f"📦 Rows scanned:        {rows}")
+    print(f"🧬 Unique graphs:       {len(unique)}")
+    print(f"📄 Inline JSON total:   {fmt_bytes(raw_total)}")
+    print(f"🔁 After dedup (raw):   {fmt_bytes(unique_raw)}")
+    print(f"🗜️  After compression:   {fmt_bytes(packed_total + ref_total)}")
+    if raw_total:
+        saved = 100 - ((packed_total + ref_total) / raw_total) * 100
+        print(f"✅ Storage saved:       {saved:.1f}%")
+        print(
+            f"🚚 Avg roadmap payload: {fmt_bytes(raw_total / rows)} inline -> {fmt_bytes(packed_total / max(len(unique), 1))} packed")
+    if dry_run:
+        print("ℹ️  Dry run: nothing was written.")
+
+
+def gc(supabase):
+    referenced = set()
+    last_id = None
+    while True:
+        query = supabase.table('user_roadmaps').select(
+            'id, graph_hash').order('id').limit(PAGE_SIZE)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.execute().data
+        if not page:
+            break
+        referenced.update(r['graph_hash'] for r in page if r['graph_hash'])
+        last_id = page[-1]['id']
+
+    orphans = []
+    total = 0
+    last_hash = None
+    while True:
+        query = supabase.table(BLOB_TABLE).select('hash').order('hash').limit(PAGE_SIZE)
+        if last_hash is not None:
+            query = query.gt('hash', last_hash)
+        page = query.execute().data
+        if not page:
+            break
+        total += len(page)
+        orphans.extend(b['hash'] for b in page if b['hash'] not in referenced)
+        last_hash = page[-1]['hash']
+
+    for i in range(0, len(orphans), PAGE_SIZE):
+        supabase.table(BLOB_TABLE).delete().in_(
+            'hash', orphans[i:i + PAGE_SIZE]).execute()
+    print(f"🧹 Removed {len(orphans)} orphaned blobs ({total - len(orphans)} kept).")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Migrate user_roadmaps.graph_data into roadmap_blobs.")
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--keep-inline', action='store_true')
+    parser.add_argument('--gc', action='store_true')
+    args = parser.parse_args()
+
+    load_dotenv()
+    try:
+        client = create_client(os.environ.get(
+            "SUPABASE_URL"), os.environ.get("SUPABASE_KEY"))
+    except Exception as e:
+        print(f"❌ Supabase Init Error: {e}")
+        sys.exit(1)
+
+    if args.gc:
+        gc(client)
+    else:
+        migrate(client, dry_run=args.dry_run, keep_inline=args.keep_inline)
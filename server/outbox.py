@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+# --- WRITE-BEHIND OUTBOX ---
+# Student writes (quiz results, saves, guest sync) are appended to a local SQLite
+# queue and acknowledged right away; a background thread drains them to Supabase.
+#
+# * Every op has an idempotency key: re-submitting the same key is a no-op.
+# * Multi-step ops checkpoint `step` locally after each Supabase write, so a retry
+#   resumes where it failed instead of re-applying (and double counting) earlier steps.
+# * Plain row inserts are grouped per table and sent as one bulk insert.
+# * Workers in different gunicorn processes share the file and claim ops with a lease.
+#   The lease is renewed before each op and at every checkpoint, and all writes are
+#   conditional on it, so a stalled worker can't finish an op someone else re-claimed.
+# * If a bulk insert is rejected, its rows are retried one by one so only the bad row fails.
+
+DB_PATH = os.environ.get("OUTBOX_DB_PATH", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "outbox.db"))
+BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 50))
+MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 12))
+LEASE_SECONDS = 60
+IDLE_POLL_SECONDS = 2
+
+_handlers = {}
+_local = threading.local()
+_wakeup = threading.Event()
+_worker = {"pid": None, "thread": None, "last_drain": None, "last_error": None}
+_worker_lock = threading.Lock()
+
+
+def _conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: an acknowledged write must survive a crash right after we answer
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idem_key TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                step INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                lease_until REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                done_at REAL
+            )""")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, next_attempt_at)")
+        _local.conn = conn
+    return conn
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class Op:
+    # `lease` is the lease_until value we wrote when claiming; every later write is
+    # conditional on it, so a worker whose lease expired (and was re-claimed by another
+    # worker) can no longer touch the row.
+    def __init__(self, row_id, kind, payload, step, lease):
+        self.id = row_id
+        self.kind = kind
+        self.payload = payload
+        self.step = step
+        self.lease = lease
+
+    def _update(self, sets, params):
+        lease = time.time() + LEASE_SECONDS
+        cur = _conn().execute(
+            f"UPDATE outbox SET {sets}, lease_until = ? WHERE id = ? AND lease_until = ?",
+            list(params) + [lease, self.id, self.lease])
+        if cur.rowcount == 0:
+            raise LeaseLost(f"lease on outbox #{self.id} expired")
+        self.lease = lease
+
+    def renew(self):
+        self._update("status = status", ())
+
+    def advance(self, step):
+        # Each checkpoint also extends the lease, so a slow multi-step op keeps it
+        self._update("step = ?", (step,))
+        self.step = step
+
+
+def handler(kind):
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(kind, payload, idem_key=None):
+    idem_key = idem_key or str(uuid.uuid4())
+    now = time.time()
+    _conn().execute(
+        "INSERT OR IGNORE INTO outbox (idem_key, kind, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+        (idem_key, kind, json.dumps(payload), now, now))
+    ensure_worker()
+    _wakeup.set()
+    return idem_key
+
+
+def insert_row(table, row, idem_key=None):
+    return enqueue('insert', {"table": table, "row": row}, idem_key)
+
+
+def _claim():
+    conn = _conn()
+    now = time.time()
+    lease = now + LEASE_SECONDS
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute("""
+            SELECT id, kind, payload, step FROM outbox
+            WHERE status = 'pending' AND next_attempt_at <= ? AND lease_until <= ?
+            ORDER BY id LIMIT ?""", (now, now, BATCH_SIZE)).fetchall()
+        if rows:
+            conn.execute(
+                f"UPDATE outbox SET lease_until = ? WHERE id IN ({','.join('?' * len(rows))})",
+                [lease] + [r[0] for r in rows])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return [Op(r[0], r[1], json.loads(r[2]), r[3], lease) for r in rows]
+
+
+def _mark_done(ops):
+    now = time.time()
+    _conn().executemany(
+        "UPDATE outbox SET status = 'done', done_at = ?, lease_until = 0 WHERE id = ? AND lease_until = ?",
+        [(now, op.id, op.lease) for op in ops])
+
+
+def _mark_failed(op, error):
+    conn = _conn()
+    row = conn.execute(
+        "SELECT attempts FROM outbox WHERE id = ? AND lease_until = ?", (op.id, op.lease)).fetchone()
+    if row is None:
+        return  # another worker owns it now
+    attempts = row[0] + 1
+    status = 'dead' if attempts >= MAX_ATTEMPTS else 'pending'
+    # Exponential backoff: 2s, 4s, 8s ... capped at 5 minutes
+    delay = min(300, 2 ** attempts)
+    conn.execute(
+        "UPDATE outbox SET attempts = ?, status = ?, next_attempt_at = ?, lease_until = 0, last_error = ? WHERE id = ? AND lease_until = ?",
+        (attempts, status, time.time() + delay, str(error)[:500], op.id, op.lease))
+    _worker["last_error"] = str(error)[:200]
+    print(f"⚠️ Outbox {op.kind}#{op.id} failed (attempt {attempts}): {error}")
+
+
+def drain_once():
+    ops = _claim()
+    if not ops:
+        return 0
+
+    # Plain inserts for the same table go out as one bulk request, in order
+    inserts = {}
+    for op in ops:
+        if op.kind == 'insert' and _renewed(op):
+            inserts.setdefault(op.payload['table'], []).append(op)
+    for table, table_ops in inserts.items():
+        try:
+            _handlers['insert'](table, [o.payload['row'] for o in table_ops])
+            _mark_done(table_ops)
+        except Exception as e:
+            if len(table_ops) == 1:
+                _mark_failed(table_ops[0], e)
+                continue
+            # One bad row rejects the whole request: retry row by row so only it fails
+            for o in table_ops:
+                try:
+                    _handlers['insert'](table, [o.payload['row']])
+                    _mark_done([o])
+                except Exception as row_error:
+                    _mark_failed(o, row_error)
+
+    for op in ops:
+        # Ops later in a batch may have waited past their lease; never start one we lost
+        if op.kind == 'insert' or not _renewed(op):
+            continue
+        fn = _handlers.get(op.kind)
+        try:
+            if fn is None:
+                raise KeyError(f"no outbox handler for '{op.kind}'")
+            fn(op)
+            _mark_done([op])
+        except LeaseLost as e:
+            print(f"⚠️ Outbox {op.kind}#{op.id} abandoned: {e}")
+        except Exception as e:
+            _mark_failed(op, e)
+
+    _worker["last_drain"] = time.time()
+    return len(ops)
+
+
+def _renewed(op):
+    try:
+        op.renew()
+        return True
+    except LeaseLost:
+        return False
+
+
+def _run():
+    last_purge = 0
+    while True:
+        try:
+            if time.time() - last_purge > 3600:
+                purge_done()
+                last_purge = time.time()
+            if drain_once() >= BATCH_SIZE:
+                continue
+        except Exception as e:
+            print(f"⚠️ Outbox Drain Error: {e}")
+        _wakeup.wait(IDLE_POLL_SECONDS)
+        _wakeup.clear()
+
+
+def ensure_worker():
+    # Threads don't survive gunicorn's fork, so (re)start per process
+    if _worker["pid"] == os.getpid() and _worker["thread"].is_alive():
+        return
+    with _worker_lock:
+        if _worker["pid"] == os.getpid() and _worker["thread"].is_alive():
+            return
+        thread = threading.Thread(target=_run, name='outbox-drain', daemon=True)
+        thread.start()
+        _worker.update(pid=os.getpid(), thread=thread)
+
+
+def status():
+    conn = _conn()
+    now = time.time()
+    counts = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+    oldest = conn.execute(
+        "SELECT MIN(created_at) FROM outbox WHERE status = 'pending'").fetchone()[0]
+    by_kind = dict(conn.execute(
+        "SELECT kind, COUNT(*) FROM outbox WHERE status = 'pending' GROUP BY kind").fetchall())
+    return {
+        "depth": counts.get('pending', 0),
+        "dead": counts.get('dead', 0),
+        "done": counts.get('done', 0),
+        "pending_by_kind": by_kind,
+        "drain_lag_seconds": round(now - oldest, 1) if oldest else 0,
+        "last_drain_ago_seconds": round(now - _worker["last_drain"], 1) if _worker["last_drain"] else None,
+        "last_error": _worker["last_error"]
+    }
+
+
+def purge_done(older_than=7 * 24 * 3600):
+    _conn().execute("DELETE FROM outbox WHERE status = 'done' AND done_at < ?",
+                    (time.time() - older_than,))
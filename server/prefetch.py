@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- BACKGROUND RESOURCE PREFETCH ---
+# When a roadmap is generated or loaded we warm the resource bundle (videos, articles,
+# PDFs) for every node so the student's first click on a node is a cache hit. The
+# bundles live in whatever cache fetch_fn writes to (cache_store 'resources'); this
+# class only runs the fetches and dedupes the ones already in flight.
+
+
+def resource_key(search_query, mode):
+    return (" ".join((search_query or '').lower().split()), mode or 'standard')
+
+
+class ResourcePrefetcher:
+    def __init__(self, fetch_fn, max_workers=3, max_pending=50, is_cached=None):
+        self.fetch_fn = fetch_fn
+        self.is_cached = is_cached  # optional (search_query, mode) -> bool, skips warm nodes
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._inflight = {}   # key -> Future
+        self.joined = 0
+        self.direct = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def _run(self, key):
+        try:
+            return self.fetch_fn(key[0], key[1])
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def enqueue(self, search_query, mode='standard'):
+        key = resource_key(search_query, mode)
+        with self._lock:
+            if key in self._inflight:
+                return
+        if self.is_cached is not None and self.is_cached(key[0], key[1]):
+            self.skipped += 1
+            return
+        with self._lock:
+            if key in self._inflight:
+                return
+            if len(self._inflight) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._inflight[key] = self._pool.submit(self._run, key)
+
+    def enqueue_roadmap(self, topic, nodes, mode='standard'):
+        for node in nodes or []:
+            label = node.get('label') if isinstance(node, dict) else None
+            if label:
+                self.enqueue(f"{topic} {label}", mode)
+
+    def get(self, search_query, mode='standard', wait=20):
+        key = resource_key(search_query, mode)
+        with self._lock:
+            future = self._inflight.get(key)
+
+        # A prefetch for this node is already running: join it instead of duplicating the work
+        if future is not None:
+            try:
+                bundle = future.result(timeout=wait)
+                self.joined += 1
+                return bundle
+            except Exception as e:
+                print(f"⚠️ Prefetch join failed: {e}")
+
+        self.direct += 1
+        return self.fetch_fn(key[0], key[1])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "inflight": len(self._inflight),
+                "joined": self.joined,
+                "direct": self.direct,
+                "skipped": self.skipped,
+                "dropped": self.dropped
+            }
@@ -0,0 +1,69 @@
+import os
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+
+# Reports what `import app` costs, per module, using CPython's -X importtime output.
+#
+#   python profile_imports.py              # top 25 modules by cumulative time
+#   python profile_imports.py --packages   # rolled up by top-level package
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_importtime(module='app'):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=HERE, capture_output=True, text=True)
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or ['(no output)']
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    return result.stderr
+
+
+def parse_importtime(stderr):
+    # Lines look like: "import time:       412 |       1203 |     flask.app"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": depth
+        })
+    return rows
+
+
+def by_package(rows):
+    totals = defaultdict(float)
+    for r in rows:
+        totals[r['module'].split('.')[0]] += r['self_ms']
+    return sorted(totals.items(), key=lambda x: x[1], reverse=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-module import cost of the server.")
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--packages', action='store_true')
+    args = parser.parse_args()
+
+    rows = parse_importtime(run_importtime(args.module))
+    total = sum(r['self_ms'] for r in rows)
+    print(f"⏱️  import {args.module}: {total:.1f} ms across {len(rows)} modules\n")
+
+    if args.packages:
+        for name, ms in by_package(rows)[:args.top]:
+            print(f"{ms:9.1f} ms  {name}")
+    else:
+        print(f"{'cumulative':>12} {'self':>9}  module")
+        for r in sorted(rows, key=lambda r: r['cumulative_ms'], reverse=True)[:args.top]:
+            print(f"{r['cumulative_ms']:9.1f} ms {r['self_ms']:6.1f} ms  {r['module']}")
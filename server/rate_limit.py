@@ -0,0 +1,161 @@
+import os
+import time
+import math
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+# --- ADMISSION CONTROL ---
+# Token buckets keyed by (route class, user_id or IP). The default backend keeps
+# counters in process memory; setting RATE_LIMIT_DB shares them across gunicorn
+# workers through a SQLite file.
+#
+# Keys come from client-supplied values (user_id, or the IP), so buckets that have sat
+# idle long enough to be full again are dropped; forgetting them changes nothing.
+# Signed-in callers are also charged against a looser per-IP bucket, so rotating
+# user_id values doesn't buy unlimited fresh buckets.
+
+# route class -> (bucket capacity, refill tokens per second)
+DEFAULT_LIMITS = {
+    'llm': (10, 10 / 60),       # quiz / roadmap / chat: bursts of 10, 10 per minute
+    'resources': (20, 20 / 60),  # scraping + YouTube quota
+}
+IDLE_SECONDS = int(os.environ.get("RATE_LIMIT_IDLE_SECONDS", 3600))
+MAX_BUCKETS = int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", 50000))
+PRUNE_SECONDS = 60
+IP_FACTOR = int(os.environ.get("RATE_LIMIT_IP_FACTOR", 5))  # one IP may be a whole classroom
+MAX_TRACKED_CLIENTS = 1000
+
+
+class MemoryBuckets:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # least recently used first
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._prune(now)
+            return (True, 0) if allowed else (False, (1 - tokens) / rate)
+
+    def _prune(self, now):
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < IDLE_SECONDS and len(self._buckets) <= MAX_BUCKETS:
+                return
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_prune = 0
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=2, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated)")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            if now - self._last_prune > PRUNE_SECONDS:
+                self._last_prune = now
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - IDLE_SECONDS,))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # Never turn a limiter failure into an outage
+            print(f"⚠️ Rate Limit Store Error: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return True, 0
+        return (True, 0) if allowed else (False, (1 - tokens) / rate)
+
+
+class RateLimiter:
+    def __init__(self, limits=None, backend=None):
+        self.limits = dict(limits or DEFAULT_LIMITS)
+        self.backend = backend or MemoryBuckets()
+        self._lock = threading.Lock()
+        self.allowed = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.rejected_clients = defaultdict(int)
+
+    def check(self, route_class, client, ip=None):
+        capacity, rate = self.limits[route_class]
+        now = time.time()
+        ok, retry_after = self.backend.take(
+            f"{route_class}:{client}", capacity, rate, now)
+        if ip and ip != client:
+            ip_ok, ip_retry = self.backend.take(
+                f"{route_class}:{ip}", capacity * IP_FACTOR, rate * IP_FACTOR, now)
+            ok, retry_after = ok and ip_ok, max(retry_after, ip_retry)
+        with self._lock:
+            if ok:
+                self.allowed[route_class] += 1
+            else:
+                self.rejected[route_class] += 1
+                self.rejected_clients[client] += 1
+                if len(self.rejected_clients) > MAX_TRACKED_CLIENTS:
+                    # Only the top offenders are ever shown; forget the long tail
+                    top = sorted(self.rejected_clients.items(), key=lambda x: x[1],
+                                 reverse=True)[:MAX_TRACKED_CLIENTS // 10]
+                    self.rejected_clients = defaultdict(int, top)
+        return ok, int(math.ceil(retry_after))
+
+    def stats(self):
+        with self._lock:
+            top = sorted(self.rejected_clients.items(),
+                         key=lambda x: x[1], reverse=True)[:10]
+            return {
+                "limits": {k: {"burst": c, "per_minute": round(r * 60, 2)} for k, (c, r) in self.limits.items()},
+                "allowed": dict(self.allowed),
+                "rejected": dict(self.rejected),
+                "top_rejected_clients": [{"client": c, "rejected": n} for c, n in top]
+            }
+
+
+def limits_from_env():
+    # e.g. RATE_LIMIT_LLM="10/60" -> burst 10, 10 requests per 60s
+    limits = dict(DEFAULT_LIMITS)
+    for name in limits:
+        spec = os.environ.get(f"RATE_LIMIT_{name.upper()}")
+        if spec:
+            count, seconds = spec.split('/')
+            limits[name] = (int(count), int(count) / float(seconds))
+    return limits
+
+
+def create_limiter():
+    path = os.environ.get("RATE_LIMIT_DB")
+    backend = SQLiteBuckets(path) if path else MemoryBuckets()
+    return RateLimiter(limits_from_env(), backend)
@@ -0,0 +1,165 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# --- PROVIDER RESILIENCE ---
+# Per-provider circuit breakers with latency-aware timeouts, plus a helper for
+# hedged calls. When a provider keeps failing we stop waiting on it and go straight
+# to the fallback content until a probe request succeeds again.
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, reset_after=30,
+                 min_timeout=1.0, max_timeout=5.0, window=100):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.short_circuited = 0
+        self._probing = False
+
+    def allow(self):
+        with self._lock:
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_after:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            # Half-open lets exactly one probe through at a time
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+            self.failures = 0
+            self.state = CLOSED
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+
+    def percentile(self, p):
+        with self._lock:
+            data = sorted(self._latencies)
+        if not data:
+            return None
+        return data[min(len(data) - 1, int(p / 100 * len(data)))]
+
+    def timeout(self):
+        # Give ~1.5x the observed p95 before giving up, clamped to a sane range
+        p95 = self.percentile(95)
+        if p95 is None:
+            return self.max_timeout
+        return round(max(self.min_timeout, min(self.max_timeout, p95 * 1.5)), 2)
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn(timeout, ...) through the breaker. Raises CircuitOpen when short-circuited."""
+        if not self.allow():
+            raise CircuitOpen(self.name)
+        start = time.time()
+        try:
+            result = fn(self.timeout(), *args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.time() - start)
+        return result
+
+    def stats(self):
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "p50_ms": int(p50 * 1000) if p50 is not None else None,
+            "p95_ms": int(p95 * 1000) if p95 is not None else None,
+            "timeout_s": self.timeout()
+        }
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name, **kwargs):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
+
+
+def stats():
+    return {name: b.stats() for name, b in _breakers.items()}
+
+
+HEDGE_WORKERS = 8
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+# Free hedge workers; when none is free we skip hedging rather than queue behind others
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+
+def hedged(fn, hedge_after, overall_timeout):
+    """
+    Call fn() on the caller's thread. If it hasn't answered within hedge_after seconds
+    a second copy starts on the hedge pool (only if a worker is free), and its answer
+    is used when the first attempt fails or times out.
+    """
+    started = time.time()
+    lock = threading.Lock()
+    state = {"done": False, "hedge": None}
+
+    def launch():
+        if not _hedge_slots.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                return fn()
+            finally:
+                _hedge_slots.release()
+        with lock:
+            if state["done"]:
+                _hedge_slots.release()
+                return
+            state["hedge"] = _hedge_pool.submit(run)
+
+    timer = threading.Timer(hedge_after, launch)
+    timer.daemon = True
+    timer.start()
+    try:
+        return fn()
+    except Exception as error:
+        with lock:
+            state["done"] = True
+            hedge = state["hedge"]
+        if hedge is None:
+            raise
+        try:
+            return hedge.result(timeout=max(0, overall_timeout - (time.time() - started)))
+        except Exception:
+            raise error
+    finally:
+        with lock:
+            state["done"] = True
+        timer.cancel()
@@ -0,0 +1,119 @@
+import os
+import json
+import zlib
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- CONTENT-ADDRESSED ROADMAP STORE ---
+# Identical graphs are stored once in `roadmap_blobs` (hash -> compressed payload)
+# and `user_roadmaps.graph_hash` points at them instead of carrying the full JSON.
+#
+#   create table roadmap_blobs (
+#       hash text primary key,
+#       payload text not null,
+#       raw_size int,
+#       packed_size int,
+#       created_at timestamptz default now()
+#   );
+#   alter table user_roadmaps add column graph_hash text references roadmap_blobs(hash);
+
+BLOB_TABLE = 'roadmap_blobs'
+
+BLOB_CACHE_SIZE = int(os.environ.get("ROADMAP_BLOB_CACHE_SIZE", 500))
+
+# Blobs are immutable, so cached graphs never go stale; the LRU only bounds memory.
+# The cache is a read cache only: put_graph always upserts, because `--gc` may have
+# deleted a blob this process still remembers.
+_blob_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(h):
+    with _cache_lock:
+        graph = _blob_cache.get(h)
+        if graph is not None:
+            _blob_cache.move_to_end(h)
+        return graph
+
+
+def _cache_put(h, graph):
+    with _cache_lock:
+        _blob_cache[h] = graph
+        _blob_cache.move_to_end(h)
+        while len(_blob_cache) > BLOB_CACHE_SIZE:
+            _blob_cache.popitem(last=False)
+
+
+def canonical_json(graph):
+    return json.dumps(graph, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def graph_hash(graph):
+    return hashlib.sha256(canonical_json(graph).encode('utf-8')).hexdigest()
+
+
+def pack_graph(graph):
+    raw = canonical_json(graph).encode('utf-8')
+    return base64.b64encode(zlib.compress(raw, 9)).decode('ascii')
+
+
+def unpack_graph(payload):
+    return json.loads(zlib.decompress(base64.b64decode(payload)).decode('utf-8'))
+
+
+def put_graph(supabase, graph):
+    if not graph:
+        return None
+    h = graph_hash(graph)
+    raw_size = len(canonical_json(graph).encode('utf-8'))
+    payload = pack_graph(graph)
+    supabase.table(BLOB_TABLE).upsert({
+        "hash": h,
+        "payload": payload,
+        "raw_size": raw_size,
+        "packed_size": len(payload)
+    }, on_conflict='hash', ignore_duplicates=True).execute()
+
+    _cache_put(h, graph)
+    return h
+
+
+def get_graph(supabase, h):
+    if not h:
+        return None
+    cached = _cache_get(h)
+    if cached is not None:
+        return cached
+
+    res = supabase.table(BLOB_TABLE).select(
+        'payload').eq('hash', h).limit(1).execute()
+    if not res.data:
+        return None
+
+    graph = unpack_graph(res.data[0]['payload'])
+    _cache_put(h, graph)
+    return graph
+
+
+def get_graphs(supabase, hashes):
+    found = {}
+    for h in set(hashes):
+        if h:
+            found[h] = _cache_get(h)
+    wanted = [h for h, graph in found.items() if graph is None]
+    if wanted:
+        res = supabase.table(BLOB_TABLE).select(
+            'hash, payload').in_('hash', wanted).execute()
+        for row in res.data:
+            found[row['hash']] = unpack_graph(row['payload'])
+            _cache_put(row['hash'], found[row['hash']])
+    return {h: found.get(h) for h in hashes if h}
+
+
+def resolve_row(supabase, row):
+    # Rows written before the migration still carry inline graph_data.
+    if row.get('graph_data') is not None:
+        return row['graph_data']
+    return get_graph(supabase, row.get('graph_hash'))
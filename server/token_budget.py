@@ -0,0 +1,144 @@
+import re
+
+# --- TOKEN BUDGETING ---
+# Keeps prompts bounded as conversations grow: recent chat turns are kept verbatim
+# up to a token budget, older turns are folded into a rolling summary, and quiz
+# "previously learned" history is cut down to the few most relevant topics.
+#
+# Token counts are estimates (~4 chars per token for English / code, which is close
+# enough for budgeting Llama prompts); the real numbers from `completion.usage` are
+# what gets logged.
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4          # role + separators per chat message
+CHAT_HISTORY_BUDGET = 1500    # tokens of verbatim history sent to the tutor
+MAX_MESSAGE_TOKENS = 400      # any single old message is truncated past this (= tutor max_tokens)
+MAX_RECENT_MESSAGES = 6
+SUMMARY_BATCH_MESSAGES = 4    # re-summarise only after this many turns left the window
+PENDING_MESSAGE_TOKENS = 60   # left the window, not summarised yet: sent shortened
+MAX_PENDING_MESSAGES = 4
+SUMMARY_INPUT_BUDGET = 2000   # tokens of new turns fed to one summary call
+QUIZ_HISTORY_TOPICS = 3
+QUIZ_HISTORY_TOPIC_CHARS = 60
+
+_WORD_RE = re.compile(r'[a-z0-9+#]+')
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def message_tokens(message):
+    return count_tokens(message.get('content', '')) + MESSAGE_OVERHEAD
+
+
+def truncate(text, max_tokens):
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + " …"
+
+
+def clean_history(history):
+    messages = []
+    for m in history or []:
+        if isinstance(m, dict) and m.get('role') in ('user', 'assistant') and isinstance(m.get('content'), str):
+            messages.append({"role": m['role'], "content": m['content']})
+    return messages
+
+
+def split_history(history, budget=CHAT_HISTORY_BUDGET, max_messages=MAX_RECENT_MESSAGES):
+    """Return (older, recent): recent is the newest slice that fits the budget."""
+    recent = []
+    used = 0
+    for m in reversed(history):
+        m = {"role": m['role'], "content": truncate(m['content'], MAX_MESSAGE_TOKENS)}
+        cost = message_tokens(m)
+        if recent and (used + cost > budget or len(recent) >= max_messages):
+            break
+        recent.insert(0, m)
+        used += cost
+    return history[:len(history) - len(recent)], recent
+
+
+def compact_history(history, cached_summary, batch=SUMMARY_BATCH_MESSAGES):
+    """
+    Build the history part of a chat prompt without calling the LLM.
+
+    cached_summary is {"summary": str, "covered": int} (or None) for this chat session.
+    Older turns already folded into the summary are sent as the summary; older turns
+    not folded yet are sent shortened. Returns (messages, due): once `batch` unfolded
+    turns have piled up, due = {"summary", "messages", "covered"} and the caller should
+    summarise them off the request path so the next turn can use the result.
+    """
+    history = clean_history(history)
+    older, recent = split_history(history)
+
+    state = cached_summary or {"summary": "", "covered": 0}
+    # A shorter history than we've already summarised means the chat was restarted
+    if len(history) < state['covered']:
+        state = {"summary": "", "covered": 0}
+    pending = older[state['covered']:]
+
+    messages = []
+    if state['summary'] and state['covered']:
+        messages.append({"role": "system",
+                         "content": f"Summary of the earlier conversation: {state['summary']}"})
+    messages.extend({"role": m['role'], "content": truncate(m['content'], PENDING_MESSAGE_TOKENS)}
+                    for m in pending[-MAX_PENDING_MESSAGES:])
+    messages.extend(recent)
+
+    due = None
+    if len(pending) >= batch:
+        due = {"summary": state['summary'], "messages": summary_input(pending),
+               "covered": len(older)}
+    return messages, due
+
+
+def summary_input(messages, budget=SUMMARY_INPUT_BUDGET):
+    """Truncate turns for the summary prompt, keeping the newest that fit the budget."""
+    kept = []
+    used = 0
+    for m in reversed(messages):
+        m = {"role": m['role'], "content": truncate(m['content'], MAX_MESSAGE_TOKENS)}
+        cost = message_tokens(m)
+        if kept and used + cost > budget:
+            break
+        kept.insert(0, m)
+        used += cost
+    return kept
+
+
+def _words(text):
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def select_quiz_history(history, current_topic, max_topics=QUIZ_HISTORY_TOPICS):
+    """Keep the prior topics most related to the current one (ties go to the most recent)."""
+    topics = []
+    for t in re.split(r'[,;\n|]', history or ''):
+        t = " ".join(t.split())[:QUIZ_HISTORY_TOPIC_CHARS]
+        if t and t.lower() not in (x.lower() for x in topics) and t.lower() != (current_topic or '').lower():
+            topics.append(t)
+    if len(topics) <= max_topics:
+        return ", ".join(topics)
+
+    current = _words(current_topic or '')
+    scored = []
+    for i, t in enumerate(topics):
+        words = _words(t)
+        overlap = len(words & current) / len(words | current) if words | current else 0
+        scored.append((overlap, i, t))
+    keep = sorted(scored, reverse=True)[:max_topics]
+    # Preserve learning order in the prompt
+    return ", ".join(t for _, _, t in sorted(keep, key=lambda x: x[1]))
+
+
+def log_usage(route, completion, estimated_prompt_tokens=None):
+    usage = getattr(completion, 'usage', None)
+    if usage is None:
+        return
+    estimate = f" (est. {estimated_prompt_tokens})" if estimated_prompt_tokens else ""
+    print(f"🧮 {route}: prompt={usage.prompt_tokens}{estimate} completion={usage.completion_tokens} total={usage.total_tokens}")
@@ -0,0 +1,206 @@
+import os
+import hmac
+import sys
+import time
+import uuid
+import random
+import inspect
+import threading
+import contextvars
+from collections import deque
+from functools import wraps
+
+# --- ON-DEMAND REQUEST PROFILING ---
+# Off by default. A request is traced when it carries `X-Profile: spans|sample` together
+# with `X-Profile-Token: $PROFILE_TOKEN` (the header is ignored when PROFILE_TOKEN is
+# unset), or when an admin turns on sampling (a fraction of all requests). The same
+# token is required to change sampling and to read traces. Two modes:
+#
+#   spans  - wall-clock spans for every helper function in app.py (cheap, structured)
+#   sample - a background thread snapshots the request thread's Python stack every few
+#            ms, which also shows time inside Supabase / Groq / BeautifulSoup / TextBlob
+#
+# The last TRACE_BUFFER traces are kept in memory and can be exported as folded stacks
+# ("a;b;c <weight>" lines) for flamegraph.pl, speedscope or inferno.
+
+MODES = ('spans', 'sample')
+SAMPLE_INTERVAL = 0.005
+MAX_SAMPLES = 5000
+# Concurrent stack samplers; further 'sample' traces fall back to span mode
+MAX_SAMPLERS = int(os.environ.get("TRACE_MAX_SAMPLERS", 2))
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+
+_config = {"sample_rate": 0.0, "mode": "spans"}
+_traces = deque(maxlen=int(os.environ.get("TRACE_BUFFER", 50)))
+_lock = threading.Lock()
+_current = contextvars.ContextVar('trace', default=None)
+_samplers = {"running": 0}
+
+
+class Trace:
+    def __init__(self, mode, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.label = label
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration_ms = None
+        self.status = None
+        self.spans = []     # (path tuple, start, end)
+        self._stack = [label]
+        self.samples = {}   # folded stack -> count
+        self._sampler = None
+        self._stop = threading.Event()
+
+    # --- span mode ---
+    def enter(self, name):
+        self._stack.append(name)
+        return time.perf_counter()
+
+    def exit(self, start):
+        self.spans.append((tuple(self._stack), start, time.perf_counter()))
+        self._stack.pop()
+
+    # --- sample mode ---
+    def start_sampler(self, thread_id):
+        def run():
+            while not self._stop.wait(SAMPLE_INTERVAL):
+                frame = sys._current_frames().get(thread_id)
+                if frame is None or sum(self.samples.values()) >= MAX_SAMPLES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join([self.label] + stack[::-1])
+                self.samples[key] = self.samples.get(key, 0) + 1
+        self._sampler = threading.Thread(target=run, name='trace-sampler', daemon=True)
+        self._sampler.start()
+
+    def folded(self):
+        if self.mode == 'sample':
+            return "\n".join(f"{k} {v}" for k, v in sorted(self.samples.items()))
+
+        # Self time per span path, in microseconds
+        total = {}
+        child = {}
+        for path, start, end in self.spans:
+            us = int((end - start) * 1_000_000)
+            total[path] = total.get(path, 0) + us
+            child[path[:-1]] = child.get(path[:-1], 0) + us
+        root = (self.label,)
+        total[root] = int((self.duration_ms or 0) * 1000)
+        lines = []
+        for path, us in sorted(total.items()):
+            self_us = us - child.get(path, 0)
+            if self_us > 0:
+                lines.append(f"{';'.join(path)} {self_us}")
+        return "\n".join(lines)
+
+    def summary(self):
+        return {
+            "id": self.id, "label": self.label, "mode": self.mode,
+            "status": self.status, "duration_ms": self.duration_ms,
+            "started_at": self.started_at,
+            "spans": len(self.spans), "samples": sum(self.samples.values())
+        }
+
+    def to_dict(self):
+        data = self.summary()
+        if self.mode == 'spans':
+            data["span_list"] = [{
+                "name": path[-1], "path": list(path),
+                "start_ms": round((s - self.start) * 1000, 2),
+                "duration_ms": round((e - s) * 1000, 2)
+            } for path, s, e in sorted(self.spans, key=lambda x: x[1])]
+        return data
+
+
+def authorized(token):
+    # Gates X-Profile and the admin trace routes; nothing is authorized without PROFILE_TOKEN
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token or '', PROFILE_TOKEN)
+
+
+def requested_mode(header_value, token=None):
+    if header_value and authorized(token):
+        value = header_value.strip().lower()
+        return value if value in MODES else 'spans'
+    if _config["sample_rate"] and random.random() < _config["sample_rate"]:
+        return _config["mode"]
+    return None
+
+
+def start(mode, label):
+    if mode == 'sample':
+        with _lock:
+            if _samplers["running"] >= MAX_SAMPLERS:
+                mode = 'spans'
+            else:
+                _samplers["running"] += 1
+    trace = Trace(mode, label)
+    trace._token = _current.set(trace)
+    if mode == 'sample':
+        trace.start_sampler(threading.get_ident())
+    return trace
+
+
+def finish(trace, status):
+    trace._stop.set()
+    if trace._sampler:
+        trace._sampler.join(timeout=1)
+        with _lock:
+            _samplers["running"] -= 1
+    trace.duration_ms = round((time.perf_counter() - trace.start) * 1000, 2)
+    trace.status = status
+    try:
+        _current.reset(trace._token)
+    except ValueError:
+        _current.set(None)
+    with _lock:
+        _traces.append(trace)
+
+
+def traced(fn):
+    name = fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        trace = _current.get()
+        if trace is None or trace.mode != 'spans':
+            return fn(*args, **kwargs)
+        start_at = trace.enter(name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            trace.exit(start_at)
+    return wrapper
+
+
+def instrument(namespace, skip=()):
+    """Wrap every plain function defined in `namespace` (a module's globals) in a span."""
+    module = namespace.get('__name__')
+    for name, obj in list(namespace.items()):
+        if inspect.isfunction(obj) and obj.__module__ == module and obj not in skip and name not in skip:
+            namespace[name] = traced(obj)
+
+
+def configure(sample_rate=None, mode=None):
+    if sample_rate is not None:
+        _config["sample_rate"] = max(0.0, min(1.0, float(sample_rate)))
+    if mode in MODES:
+        _config["mode"] = mode
+    return dict(_config)
+
+
+def list_traces():
+    with _lock:
+        return [t.summary() for t in reversed(_traces)]
+
+
+def get_trace(trace_id):
+    with _lock:
+        for t in _traces:
+            if t.id == trace_id:
+                return t
+    return None
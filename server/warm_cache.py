@@ -0,0 +1,99 @@
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cache_store
+from app import supabase, generate_roadmap, get_quiz_pool, fetch_resource_bundle
+
+# Precomputes roadmaps, quiz pools and resource bundles for the most popular topics
+# so a freshly deployed gunicorn instance starts with a hot local cache.
+#
+#   python warm_cache.py --topics 20 --workers 4
+
+PAGE_SIZE = 1000
+
+
+def scan(table, columns):
+    offset = 0
+    while True:
+        page = supabase.table(table).select(columns).range(
+            offset, offset + PAGE_SIZE - 1).execute().data
+        if not page:
+            return
+        yield from page
+        # Only an empty page ends the scan; the server may cap pages below PAGE_SIZE
+        offset += len(page)
+
+
+def popular_topics(limit):
+    roadmaps = Counter()
+    nodes = Counter()
+    for row in scan('user_roadmaps', 'topic, mode'):
+        if row.get('topic'):
+            roadmaps[(row['topic'].strip().title(), row.get('mode') or 'standard')] += 1
+    for row in scan('saved_resources', 'roadmap_topic, node_label'):
+        if row.get('roadmap_topic') and row.get('node_label'):
+            topic = row['roadmap_topic'].strip().title()
+            roadmaps[(topic, 'standard')] += 1
+            nodes[(topic, row['node_label'])] += 1
+    return [t for t, _ in roadmaps.most_common(limit)], nodes
+
+
+def run(tasks, workers):
+    done, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, *args): (fn.__name__, args) for fn, args in tasks}
+        for future in as_completed(futures):
+            name, args = futures[future]
+            try:
+                yield args, future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ {name}{args} failed: {e}")
+    print(f"   ✔ {done} done, {failed} failed")
+
+
+def warm_roadmap(topic, mode):
+    cached = cache_store.get('roadmap', cache_store.make_key(topic, mode))
+    return cached or generate_roadmap(topic, mode)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Warm the local cache store.")
+    parser.add_argument('--topics', type=int, default=20,
+                        help="How many popular topic/mode pairs to warm")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Max concurrent LLM / scrape calls")
+    parser.add_argument('--skip-quizzes', action='store_true')
+    parser.add_argument('--skip-resources', action='store_true')
+    args = parser.parse_args()
+
+    print("📊 Reading popular topics...")
+    topics, saved_nodes = popular_topics(args.topics)
+    print(f"   {len(topics)} topic/mode pairs, {len(saved_nodes)} saved nodes")
+
+    print("🗺️  Precomputing roadmaps...")
+    node_jobs = set()
+    for (topic, mode), roadmap in run([(warm_roadmap, t) for t in topics], args.workers):
+        for node in roadmap.get('nodes', []):
+            node_jobs.add((topic, node['label'], mode))
+    wanted = {t for t, _ in topics}
+    for (topic, label), _ in saved_nodes.most_common():
+        if topic in wanted:
+            node_jobs.add((topic, label, 'standard'))
+
+    if not args.skip_quizzes:
+        print(f"📝 Precomputing quiz pools for {len(node_jobs)} nodes...")
+        pairs = {(topic, label) for topic, label, _ in node_jobs}
+        for _ in run([(get_quiz_pool, p) for p in pairs], args.workers):
+            pass
+
+    if not args.skip_resources:
+        print(f"📚 Precomputing resource bundles for {len(node_jobs)} nodes...")
+        jobs = [(fetch_resource_bundle, (f"{topic} {label}", mode))
+                for topic, label, mode in node_jobs]
+        for _ in run(jobs, args.workers):
+            pass
+
+    print(f"✅ Cache warmed: {cache_store.count()}")